@@ -0,0 +1,130 @@
+"""Claim latency against pending-queue size.
+
+Compares the old COUNT(*) + ORDER BY RANDOM() + UPDATE ANY(%s) sequence with
+the single UPDATE ... RETURNING claim from core.db.claims. Runs against a
+scratch database given by CONN_STRING_BENCH and never touches real data: the
+table is created as a TEMP table shadowing translated_articles.
+
+    CONN_STRING_BENCH=postgresql://... python benchmarks/claim_benchmark.py --sizes 1000,10000,100000
+"""
+import os
+import sys
+import time
+import argparse
+import psycopg2
+from psycopg2.extras import execute_values
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.db.claims import CLAIM_QUERY, CLAIM_COLUMNS_QUERY, PENDING_INDEX_QUERY, LEASE_SECONDS
+
+SCHEMA_QUERY = """
+    CREATE TEMP TABLE translated_articles (
+        url text PRIMARY KEY,
+        title text,
+        language text,
+        sourcecountry text,
+        category text,
+        code text,
+        utc_datetime timestamptz,
+        thread_status text
+    );
+"""
+
+LEGACY_COUNT_QUERY = """
+    SELECT COUNT(*)
+    FROM translated_articles
+    WHERE thread_status = 'pending'
+    AND utc_datetime >= NOW() - INTERVAL '2 days';
+"""
+
+LEGACY_FETCH_QUERY = """
+    SELECT url, title, language, sourcecountry, category, code
+    FROM translated_articles
+    WHERE thread_status = 'pending'
+    AND utc_datetime >= NOW() - INTERVAL '2 days'
+    ORDER BY RANDOM()
+    LIMIT %s
+    FOR UPDATE SKIP LOCKED;
+"""
+
+LEGACY_UPDATE_QUERY = """
+    UPDATE translated_articles
+    SET thread_status = 'processing'
+    WHERE url = ANY(%s);
+"""
+
+
+def seed(cursor, size):
+    """Fills the temp table with `size` pending rows spread over the last two days"""
+    cursor.execute("DROP TABLE IF EXISTS pg_temp.translated_articles;")
+    cursor.execute(SCHEMA_QUERY)
+    # the claim columns come from core.db.claims, so the temp table keeps up with the claim query
+    cursor.execute(CLAIM_COLUMNS_QUERY)
+    rows = [
+        (f"https://example.com/{i}", f"title {i}", 'English', 'United States',
+         f"category-{i % 8}", f"CODE_{i % 32}", f"{i % 172800} seconds", 'pending')
+        for i in range(size)
+    ]
+    execute_values(
+        cursor,
+        """
+        INSERT INTO translated_articles
+        (url, title, language, sourcecountry, category, code, utc_datetime, thread_status)
+        SELECT url, title, language, sourcecountry, category, code, NOW() - age::interval, status
+        FROM (VALUES %s) AS v(url, title, language, sourcecountry, category, code, age, status);
+        """,
+        rows,
+        page_size=10000
+    )
+    cursor.execute(PENDING_INDEX_QUERY)
+    cursor.execute("ANALYZE translated_articles;")
+
+
+def legacy_claim(cursor, limit):
+    cursor.execute(LEGACY_COUNT_QUERY)
+    cursor.fetchone()
+    cursor.execute(LEGACY_FETCH_QUERY, (limit,))
+    urls = [row[0] for row in cursor.fetchall()]
+    cursor.execute(LEGACY_UPDATE_QUERY, (urls,))
+    return len(urls)
+
+
+def returning_claim(cursor, limit):
+    cursor.execute(CLAIM_QUERY, ('claim-benchmark', LEASE_SECONDS, limit))
+    return len(cursor.fetchall())
+
+
+def time_claim(conn, claim, limit, repeats):
+    """Median wall time of `claim` in ms; every run is rolled back so the queue size stays fixed"""
+    timings = []
+    with conn.cursor() as cursor:
+        for _ in range(repeats):
+            cursor.execute("SAVEPOINT claim_bench;")
+            start = time.perf_counter()
+            claim(cursor, limit)
+            timings.append((time.perf_counter() - start) * 1000)
+            cursor.execute("ROLLBACK TO SAVEPOINT claim_bench;")
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark article claim latency against pending-queue size.')
+    parser.add_argument('--sizes', type=str, default='1000,10000,100000', help='Comma-separated pending-queue sizes')
+    parser.add_argument('--limit', type=int, default=4500, help='Rows claimed per call (num_threads * max_articles_per_thread)')
+    parser.add_argument('--repeats', type=int, default=5, help='Runs per size; the median is reported')
+    args = parser.parse_args()
+
+    with psycopg2.connect(os.environ['CONN_STRING_BENCH']) as conn:
+        print(f"{'pending':>10} {'legacy ms':>12} {'returning ms':>14}")
+        for size in [int(s) for s in args.sizes.split(',')]:
+            with conn.cursor() as cursor:
+                seed(cursor, size)
+            legacy_ms = time_claim(conn, legacy_claim, args.limit, args.repeats)
+            returning_ms = time_claim(conn, returning_claim, args.limit, args.repeats)
+            print(f"{size:>10} {legacy_ms:>12.1f} {returning_ms:>14.1f}")
+        conn.rollback()
+
+
+if __name__ == '__main__':
+    main()
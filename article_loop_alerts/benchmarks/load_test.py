@@ -0,0 +1,493 @@
+"""Offline load test for the fetch and process paths of main_loop.py.
+
+Runs the real claim / dispatch / heartbeat / outcome-write code against a
+scratch Postgres seeded with synthetic pending articles. pull_article is
+replaced by a stand-in whose extract_translate sleeps for a configurable
+latency, raises injected errors and 429s, and judges a fixed fraction of
+articles relevant, so no LLM, GDELT or production credentials are needed.
+
+The database is CONN_STRING_BENCH, or with --start-postgres a throwaway
+cluster started from the initdb/pg_ctl binaries on PATH. Every table the
+harness uses is dropped and recreated, so never point it at real data.
+
+    CONN_STRING_BENCH=postgresql://... python benchmarks/load_test.py \\
+        --size 20000 --threads 8,32 --batch-sizes 25,100
+
+Process runs go through process_pending_articles, so every configuration
+clusters near-duplicates with cluster_claimed exactly as the loop does. Each
+configuration appends a line to benchmarks/results/load_test.jsonl
+(git-ignored) and is compared with the previous run of the same configuration.
+"""
+import io
+import os
+import sys
+import json
+import time
+import types
+import random
+import shutil
+import socket
+import argparse
+import tempfile
+import subprocess
+import threading
+from contextlib import redirect_stdout
+
+import pandas as pd
+import psycopg2
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from core.db.claims import STATUS_PENDING
+
+DEFAULT_RESULTS = os.path.join(ROOT, 'benchmarks', 'results', 'load_test.jsonl')
+THROUGHPUT_REGRESSION = 0.10  # flagged when articles/sec drops by more than this
+P99_REGRESSION = 0.20
+
+SCHEMA_QUERIES = [
+    "DROP TABLE IF EXISTS translated_articles, bench_relevant_articles, fetch_watermarks, llm_result_cache;",
+    """
+    CREATE TABLE translated_articles (
+        url text PRIMARY KEY,
+        title text,
+        language text,
+        sourcecountry text,
+        category text,
+        code text,
+        utc_datetime timestamptz,
+        thread_status text
+    );
+    """,
+    """
+    CREATE TABLE bench_relevant_articles (
+        url text PRIMARY KEY,
+        category text,
+        inserted_at timestamptz NOT NULL DEFAULT NOW()
+    );
+    """,
+]
+
+# story s repeats every `stories` rows, as exact copies and under two site suffixes,
+# so the result cache and the near-duplicate index both get work
+SEED_QUERY = """
+    INSERT INTO translated_articles
+    (url, title, language, sourcecountry, category, code, utc_datetime, thread_status)
+    SELECT 'https://example.com/' || i,
+           'Regional council approves new budget for story ' || s
+               || (ARRAY['', ' - Daily Herald', ' | World News'])[1 + (i / %(stories)s) %% 3],
+           'English', 'United States',
+           'category-' || (s %% %(categories)s), 'CODE_' || (s %% 32), NOW() - make_interval(secs => i %% 172800), 'pending'
+    FROM generate_series(1, %(size)s) AS i, LATERAL (SELECT i %% %(stories)s AS s) AS story;
+"""
+
+DB_STATS_QUERY = """
+    SELECT xact_commit, xact_rollback, tup_returned, tup_fetched, tup_inserted, tup_updated, blks_read, blks_hit
+    FROM pg_stat_database
+    WHERE datname = current_database();
+"""
+DB_STATS_COLUMNS = [
+    'xact_commit', 'xact_rollback', 'tup_returned', 'tup_fetched', 'tup_inserted', 'tup_updated', 'blks_read', 'blks_hit'
+]
+
+
+class FakeLLM:
+    """Stands in for the LLM behind extract_translate
+
+    Each chunk sleeps `latency + per_article * len(chunk)` seconds with +-`jitter`
+    spread, then either raises (`error_rate`, `throttle_rate`) or returns the chunk
+    with a relevance column; `missing_rate` of the articles are left out of the
+    result, which the loop records as failures.
+    """
+
+    def __init__(self, latency=2.0, per_article=0.05, jitter=0.25, error_rate=0.0, throttle_rate=0.0,
+                 missing_rate=0.0, relevant_rate=0.3, seed=0):
+        self.latency = latency
+        self.per_article = per_article
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.missing_rate = missing_rate
+        self.relevant_rate = relevant_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _draw(self):
+        with self._lock:
+            return self._random.random()
+
+    def extract_translate(self, category, prompt, articles_df, cursor):
+        spread = 1 + self.jitter * (2 * self._draw() - 1)
+        time.sleep(max(0.0, (self.latency + self.per_article * len(articles_df)) * spread))
+        roll = self._draw()
+        if roll < self.throttle_rate:
+            raise ThrottledError("429 Too Many Requests")
+        if roll < self.throttle_rate + self.error_rate:
+            raise RuntimeError("injected LLM error")
+        kept = articles_df[[self._draw() >= self.missing_rate for _ in range(len(articles_df))]].copy()
+        kept['relevance'] = [self._draw() < self.relevant_rate for _ in range(len(kept))]
+        return kept
+
+
+class ThrottledError(Exception):
+    status_code = 429
+
+
+class FakeUpstream:
+    """Stands in for fetch_articles_past: `rows_per_code` fresh articles per call after `latency` seconds"""
+
+    def __init__(self, rows_per_code=50, latency=0.5):
+        self.rows_per_code = rows_per_code
+        self.latency = latency
+        self._calls = 0
+        self._lock = threading.Lock()
+
+    def fetch_articles_past(self, category, code, max_requests, prompt, start, end, cursor):
+        time.sleep(self.latency)
+        with self._lock:
+            self._calls += 1
+            call = self._calls
+        return pd.DataFrame({
+            'url': [f"https://example.com/fetched/{call}/{i}" for i in range(self.rows_per_code)],
+            'title': [f"title {i}" for i in range(self.rows_per_code)],
+            'language': 'English',
+            'sourcecountry': 'United States',
+            'category': category,
+            'code': code,
+            'utc_datetime': end,
+            'thread_status': 'pending',
+        })
+
+
+def insert_relevant_articles(processed_articles, cursor):
+    relevant = processed_articles[processed_articles['relevance'] == True]
+    if relevant.empty:
+        return
+    cursor.execute(
+        """
+        INSERT INTO bench_relevant_articles (url, category)
+        SELECT * FROM UNNEST(%s::text[], %s::text[])
+        ON CONFLICT DO NOTHING;
+        """,
+        (list(relevant['url']), list(relevant['category']))
+    )
+
+
+def install_stand_ins(llm, upstream):
+    """Registers pull_article and lda_funcs replacements before main_loop imports them"""
+    pull_article = types.ModuleType('pull_article')
+    pull_article.pd = pd
+    pull_article.extract_translate = llm.extract_translate
+    pull_article.insert_relevant_articles = insert_relevant_articles
+    pull_article.fetch_articles_past = upstream.fetch_articles_past
+    sys.modules['pull_article'] = pull_article
+    sys.modules['lda_funcs'] = types.ModuleType('lda_funcs')
+
+
+class LocalPostgres:
+    """Throwaway cluster in a temp dir, for machines without a scratch database"""
+
+    def __init__(self):
+        self.dir = tempfile.mkdtemp(prefix='article-loop-bench-')
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.port = sock.getsockname()[1]
+        self.dsn = f"postgresql://bench@127.0.0.1:{self.port}/postgres"
+
+    def start(self):
+        data = os.path.join(self.dir, 'data')
+        subprocess.run(['initdb', '-D', data, '-U', 'bench', '--auth=trust'], check=True, stdout=subprocess.DEVNULL)
+        subprocess.run(
+            ['pg_ctl', '-D', data, '-l', os.path.join(self.dir, 'postgres.log'), '-w',
+             '-o', f"-p {self.port} -k {self.dir} -c max_connections=300", 'start'],
+            check=True, stdout=subprocess.DEVNULL
+        )
+        return self.dsn
+
+    def stop(self):
+        subprocess.run(['pg_ctl', '-D', os.path.join(self.dir, 'data'), '-m', 'fast', 'stop'], stdout=subprocess.DEVNULL)
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+def db_stats(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_stat_clear_snapshot();")
+        cursor.execute(DB_STATS_QUERY)
+        row = cursor.fetchone()
+    conn.commit()
+    return dict(zip(DB_STATS_COLUMNS, row))
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def rounded(value, digits=2):
+    return '-' if value is None else str(round(value, digits))
+
+
+def timed(func, latencies):
+    def wrapper(*args, **kwargs):
+        start = time.monotonic()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            latencies.append(time.monotonic() - start)
+    return wrapper
+
+
+def prepare_schema(conn, main_loop):
+    with conn.cursor() as cursor:
+        for query in SCHEMA_QUERIES:
+            cursor.execute(query)
+        main_loop.ensure_claim_schema(cursor)
+        main_loop.ensure_watermark_table(cursor)
+        main_loop.ensure_result_cache_table(cursor)
+    conn.commit()
+
+
+def seed(conn, size, categories, duplicate_share):
+    """Seeds `size` pending articles of which `duplicate_share` repeat an earlier story; every run starts with a cold cache"""
+    stories = max(1, round(size * (1 - duplicate_share)))
+    with conn.cursor() as cursor:
+        cursor.execute("TRUNCATE translated_articles, bench_relevant_articles, fetch_watermarks, llm_result_cache;")
+        cursor.execute(SEED_QUERY, {'stories': stories, 'categories': categories, 'size': size})
+        cursor.execute("ANALYZE translated_articles;")
+    conn.commit()
+
+
+def outcome_counts(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT thread_status, COUNT(*) FROM translated_articles GROUP BY thread_status;")
+        counts = dict(cursor.fetchall())
+    conn.commit()
+    return counts
+
+
+def run_process(main_loop, conn, threads, batch_size, args):
+    """Drains the seeded queue with one threads/batch configuration"""
+    seed(conn, args.size, args.categories, args.duplicate_share)
+    main_loop.RESULT_CACHE.reset_stats()
+    latencies = []
+    controller = main_loop.CONTROLLER
+    process_article_batch = main_loop.process_article_batch
+    main_loop.process_article_batch = timed(process_article_batch, latencies)
+
+    pool_before = main_loop.articles_pool().metrics()
+    stats_before = db_stats(conn)
+    start = time.monotonic()
+    cycles = 0
+    try:
+        backlog = True
+        while backlog and cycles < args.max_cycles:
+            # the controller would otherwise move the setpoints between cycles
+            controller.workers, controller.batch_size = threads, batch_size
+            with main_loop.articles_pool().cursor() as cursor:
+                backlog = main_loop.process_pending_articles(cursor, threads, batch_size)
+            cycles += 1
+    finally:
+        main_loop.process_article_batch = process_article_batch
+    elapsed = time.monotonic() - start
+    time.sleep(1)  # pg_stat_database lags the backends by up to a second
+    stats_after = db_stats(conn)
+    pool_after = main_loop.articles_pool().metrics()
+
+    outcomes = outcome_counts(conn)
+    finished = sum(count for status, count in outcomes.items() if status != STATUS_PENDING)
+    checkouts = pool_after['checkouts'] - pool_before['checkouts']
+    return {
+        'cycles': cycles,
+        'seconds': round(elapsed, 2),
+        'articles': finished,
+        'articles_per_sec': round(finished / elapsed, 2) if elapsed else None,
+        'chunks': len(latencies),
+        'chunk_p50': percentile(latencies, 50),
+        'chunk_p99': percentile(latencies, 99),
+        'cache_hit_rate': round(main_loop.RESULT_CACHE.hit_rate(), 4),
+        'outcomes': outcomes,
+        'db': {name: stats_after[name] - stats_before[name] for name in DB_STATS_COLUMNS},
+        'pool_wait_avg': (pool_after['wait_total'] - pool_before['wait_total']) / checkouts if checkouts else 0.0,
+        'pool_wait_max': pool_after['wait_max'],
+    }
+
+
+def run_fetch(main_loop, conn, dsn, args):
+    """One fetch_articles cycle over `categories` x `codes_per_category` codes"""
+    with conn.cursor() as cursor:
+        cursor.execute("TRUNCATE translated_articles, fetch_watermarks;")
+    conn.commit()
+    main_loop.FETCH_UPSTREAM = 'bench'
+    main_loop.FETCH_RATE = args.fetch_rate
+    main_loop.FETCH_BURST = max(1, int(args.fetch_rate))
+    leader = main_loop.LeaderLock(dsn, 'bench-fetch')
+    stats_before = db_stats(conn)
+    start = time.monotonic()
+    try:
+        main_loop.fetch_articles(main_loop.get_registry(), leader, main_loop.SeenUrls(max_size=args.size))
+    finally:
+        leader.close()
+    elapsed = time.monotonic() - start
+    time.sleep(1)
+    stats_after = db_stats(conn)
+    inserted = sum(outcome_counts(conn).values())
+    return {
+        'seconds': round(elapsed, 2),
+        'articles': inserted,
+        'articles_per_sec': round(inserted / elapsed, 2) if elapsed else None,
+        'db': {name: stats_after[name] - stats_before[name] for name in DB_STATS_COLUMNS},
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def compare(result, history):
+    """Regression notes against the last stored run with the same configuration"""
+    previous = [entry for entry in history if entry['config'] == result['config']]
+    if not previous:
+        return []
+    last = previous[-1]['metrics']
+    current = result['metrics']
+    notes = []
+    if last.get('articles_per_sec') and current.get('articles_per_sec') is not None:
+        change = current['articles_per_sec'] / last['articles_per_sec'] - 1
+        if change < -THROUGHPUT_REGRESSION:
+            notes.append(f"throughput {change:+.0%} vs {previous[-1]['revision']}")
+    if last.get('chunk_p99') and current.get('chunk_p99') is not None:
+        change = current['chunk_p99'] / last['chunk_p99'] - 1
+        if change > P99_REGRESSION:
+            notes.append(f"chunk p99 {change:+.0%} vs {previous[-1]['revision']}")
+    return notes
+
+
+def write_config(path, categories, codes_per_category):
+    config = {
+        f"category-{i}": {
+            'prompt': f"Benchmark prompt for category-{i}",
+            'codes': [f"CODE_{j}" for j in range(codes_per_category)],
+        }
+        for i in range(categories)
+    }
+    with open(path, 'w') as file:
+        json.dump(config, file)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Offline throughput and latency benchmark for main_loop.py.')
+    parser.add_argument('--size', type=int, default=20000, help='Pending articles seeded per configuration')
+    parser.add_argument('--categories', type=int, default=8, help='Synthetic categories')
+    parser.add_argument('--duplicate-share', type=float, default=0.5,
+                        help='Fraction of seeded articles that repeat an earlier story, exactly or with a site suffix')
+    parser.add_argument('--threads', type=str, default='8,32', help='Comma-separated worker counts')
+    parser.add_argument('--batch-sizes', type=str, default='25,100', help='Comma-separated chunk sizes')
+    parser.add_argument('--max-cycles', type=int, default=50, help='Process cycles per configuration before giving up')
+    parser.add_argument('--llm-latency', type=float, default=2.0, help='Seconds per LLM call before per-article cost')
+    parser.add_argument('--llm-per-article', type=float, default=0.05, help='Extra seconds per article in the chunk')
+    parser.add_argument('--llm-jitter', type=float, default=0.25, help='Relative latency spread')
+    parser.add_argument('--llm-error-rate', type=float, default=0.0, help='Fraction of LLM calls that raise')
+    parser.add_argument('--llm-throttle-rate', type=float, default=0.0, help='Fraction of LLM calls that return 429')
+    parser.add_argument('--llm-missing-rate', type=float, default=0.0, help='Fraction of articles missing from results')
+    parser.add_argument('--fetch', action='store_true', help='Also benchmark one fetch_articles cycle')
+    parser.add_argument('--codes-per-category', type=int, default=20, help='Codes per category for --fetch')
+    parser.add_argument('--fetch-rows', type=int, default=50, help='Articles returned per code for --fetch')
+    parser.add_argument('--fetch-latency', type=float, default=0.5, help='Seconds per upstream call for --fetch')
+    parser.add_argument('--fetch-rate', type=float, default=20.0, help='Upstream calls per second for --fetch')
+    parser.add_argument('--start-postgres', action='store_true', help='Start a throwaway cluster with initdb/pg_ctl')
+    parser.add_argument('--results', type=str, default=DEFAULT_RESULTS, help='JSONL file results are appended to')
+    parser.add_argument('--no-save', action='store_true', help='Report without appending to the results file')
+    parser.add_argument('--verbose', action='store_true', help='Show the loop\'s own per-chunk output')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    threads_list = [int(t) for t in args.threads.split(',')]
+    batch_sizes = [int(b) for b in args.batch_sizes.split(',')]
+
+    local = None
+    if args.start_postgres:
+        local = LocalPostgres()
+        dsn = local.start()
+    else:
+        dsn = os.environ['CONN_STRING_BENCH']
+    if dsn in (os.environ.get('CONN_STRING_ARTICLES'), os.environ.get('CONN_STRING_BACKEND')):
+        sys.exit("CONN_STRING_BENCH must not be a production database")
+
+    workdir = tempfile.mkdtemp(prefix='article-loop-config-')
+    write_config(os.path.join(workdir, 'gcam_config.json'), args.categories, args.codes_per_category)
+    os.environ['CONN_STRING_ARTICLES'] = dsn
+    os.environ['CONN_STRING_BACKEND'] = dsn
+    os.environ.pop('SLACK_WEBHOOK_URL', None)  # AlertLogger reads it at import time
+
+    llm = FakeLLM(
+        latency=args.llm_latency, per_article=args.llm_per_article, jitter=args.llm_jitter,
+        error_rate=args.llm_error_rate, throttle_rate=args.llm_throttle_rate, missing_rate=args.llm_missing_rate
+    )
+    install_stand_ins(llm, FakeUpstream(args.fetch_rows, args.fetch_latency))
+    cwd = os.getcwd()
+    os.chdir(workdir)  # get_registry() reads gcam_config.json from the working directory
+    try:
+        import main_loop
+        main_loop.size_pools(max(threads_list))
+        history = load_history(args.results)
+        revision = git_revision()
+        conn = psycopg2.connect(dsn)
+        prepare_schema(conn, main_loop)
+
+        runs = [('process', threads, batch) for threads in threads_list for batch in batch_sizes]
+        if args.fetch:
+            runs.append(('fetch', None, None))
+
+        print(f"{'run':<8} {'threads':>7} {'batch':>5} {'art/s':>8} {'p50 s':>7} {'p99 s':>7} {'commits':>8} {'pool wait':>9}")
+        for kind, threads, batch in runs:
+            config = {
+                'kind': kind, 'threads': threads, 'batch_size': batch, 'size': args.size,
+                'duplicate_share': args.duplicate_share,
+                'llm_latency': args.llm_latency, 'llm_per_article': args.llm_per_article,
+                'llm_error_rate': args.llm_error_rate, 'llm_throttle_rate': args.llm_throttle_rate,
+            }
+            output = io.StringIO()
+            with redirect_stdout(sys.stdout if args.verbose else output):
+                if kind == 'fetch':
+                    metrics = run_fetch(main_loop, conn, dsn, args)
+                else:
+                    metrics = run_process(main_loop, conn, threads, batch, args)
+            result = {'revision': revision, 'timestamp': time.time(), 'config': config, 'metrics': metrics}
+            notes = compare(result, history)
+
+            print(
+                f"{kind:<8} {threads or '-':>7} {batch or '-':>5} {rounded(metrics['articles_per_sec']):>8} "
+                f"{rounded(metrics.get('chunk_p50')):>7} {rounded(metrics.get('chunk_p99')):>7} "
+                f"{metrics['db']['xact_commit']:>8} {rounded(metrics.get('pool_wait_avg'), 4):>9}"
+                + (f"  REGRESSION: {'; '.join(notes)}" if notes else '')
+            )
+            if not args.no_save:
+                os.makedirs(os.path.dirname(args.results), exist_ok=True)
+                with open(args.results, 'a') as file:
+                    file.write(json.dumps(result) + '\n')
+        conn.close()
+        main_loop.close_pools()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+        if local is not None:
+            local.stop()
+
+
+if __name__ == '__main__':
+    main()
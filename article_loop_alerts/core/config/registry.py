@@ -0,0 +1,77 @@
+import os
+import json
+import threading
+
+DEFAULT_CONFIG_PATH = 'gcam_config.json'
+DEFAULT_PROMPT = "Extract and summarize the key facts and information from this article."
+
+
+class ConfigRegistry:
+    """Parses gcam_config.json once and reparses it only when its mtime changes"""
+
+    def __init__(self, path=DEFAULT_CONFIG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._data = {}
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            if self._mtime is None:
+                raise
+            print(f"Config stat failed, keeping last good config: {e}")
+            return
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            try:
+                with open(self.path) as file:
+                    data = json.load(file)
+            except (OSError, ValueError) as e:
+                if self._mtime is None:
+                    raise
+                print(f"Config reload failed, keeping last good config: {e}")
+                return
+            self._data = data
+            self._mtime = mtime
+            print(f"Loaded {len(data)} categories from {self.path}")
+
+    def get(self):
+        """Returns the current config dict; callers must treat it as read-only"""
+        self._refresh()
+        return self._data
+
+    def categories(self):
+        return list(self.get())
+
+    def prompt(self, category):
+        entry = self.get().get(category)
+        return entry['prompt'] if entry else DEFAULT_PROMPT
+
+    def codes(self, category):
+        entry = self.get().get(category)
+        return entry['codes'] if entry else []
+
+    def worker_limits(self):
+        """Optional per-category `max_workers` caps from the config"""
+        return {
+            category: entry['max_workers']
+            for category, entry in self.get().items()
+            if entry.get('max_workers')
+        }
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(path=DEFAULT_CONFIG_PATH):
+    """Returns the process-wide registry for `path`"""
+    with _registries_lock:
+        if path not in _registries:
+            _registries[path] = ConfigRegistry(path)
+        return _registries[path]
@@ -0,0 +1,46 @@
+from datetime import timezone
+
+CHECKPOINT_TABLE_QUERY = """
+    CREATE TABLE IF NOT EXISTS backdate_checkpoints (
+        run_key text NOT NULL,
+        shard_start timestamptz NOT NULL,
+        shard_end timestamptz NOT NULL,
+        seconds double precision,
+        completed_at timestamptz NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (run_key, shard_start, shard_end)
+    );
+"""
+
+COMPLETED_SHARDS_QUERY = """
+    SELECT shard_start, shard_end
+    FROM backdate_checkpoints
+    WHERE run_key = %s
+    AND shard_start >= %s
+    AND shard_end <= %s;
+"""
+
+MARK_SHARD_QUERY = """
+    INSERT INTO backdate_checkpoints (run_key, shard_start, shard_end, seconds)
+    VALUES (%s, %s, %s, %s)
+    ON CONFLICT (run_key, shard_start, shard_end) DO UPDATE
+    SET seconds = EXCLUDED.seconds, completed_at = NOW();
+"""
+
+
+def ensure_checkpoint_table(cursor):
+    cursor.execute(CHECKPOINT_TABLE_QUERY)
+    cursor.connection.commit()
+
+
+def completed_shards(cursor, run_key, start, end):
+    """{(shard_start, shard_end)} in UTC already finished for `run_key` inside [start, end]"""
+    cursor.execute(COMPLETED_SHARDS_QUERY, (run_key, start, end))
+    return {
+        (shard_start.astimezone(timezone.utc), shard_end.astimezone(timezone.utc))
+        for shard_start, shard_end in cursor.fetchall()
+    }
+
+
+def mark_shard_complete(cursor, run_key, shard_start, shard_end, seconds):
+    """Records a finished shard; the caller commits"""
+    cursor.execute(MARK_SHARD_QUERY, (run_key, shard_start, shard_end, seconds))
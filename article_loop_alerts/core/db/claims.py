@@ -0,0 +1,284 @@
+import os
+import uuid
+import socket
+
+PENDING_WINDOW = "2 days"
+STATUS_PENDING = 'pending'
+STATUS_PROCESSING = 'processing'
+STATUS_PROCESSED = 'processed'
+STATUS_IRRELEVANT = 'irrelevant'
+STATUS_FAILED = 'failed'  # worker-side outcome; stored as a retry or as dead_letter
+STATUS_DEAD_LETTER = 'dead_letter'
+TERMINAL_STATUSES = (STATUS_PROCESSED, STATUS_IRRELEVANT, STATUS_DEAD_LETTER)
+CLAIM_COLUMNS = ['url', 'title', 'language', 'sourcecountry', 'category', 'code']
+
+LEASE_SECONDS = 600
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF_SECONDS = 900  # doubles with every failed attempt
+RETRY_BACKOFF_MAX_SECONDS = 43200
+
+# shared by failures and expired leases: count the attempt, then back off or dead-letter
+FAILED_ATTEMPT_SET = f"""attempts = t.attempts + 1,
+        thread_status = CASE WHEN t.attempts + 1 >= {MAX_ATTEMPTS}
+            THEN '{STATUS_DEAD_LETTER}' ELSE 'pending' END,
+        next_eligible_at = CASE WHEN t.attempts + 1 >= {MAX_ATTEMPTS}
+            THEN NULL
+            ELSE NOW() + make_interval(secs => LEAST({RETRY_BACKOFF_MAX_SECONDS}, {RETRY_BACKOFF_SECONDS} * power(2, t.attempts)))
+            END,
+        claimed_by = NULL,
+        lease_expires_at = NULL"""
+
+BOOKKEEPING_COLUMNS = {
+    'claimed_by': 'text',
+    'lease_expires_at': 'timestamptz',
+    'attempts': 'integer NOT NULL DEFAULT 0',
+    'next_eligible_at': 'timestamptz',
+    'last_error': 'text',
+    'processed_at': 'timestamptz',
+}
+SCHEMA_LOCK_TIMEOUT = '5s'  # give up rather than queue every claim and insert behind the ALTER
+
+
+def add_columns_query(columns):
+    return "ALTER TABLE translated_articles " + ', '.join(
+        f"ADD COLUMN IF NOT EXISTS {name} {BOOKKEEPING_COLUMNS[name]}" for name in columns
+    ) + ';'
+
+
+# all columns at once, for scratch and temp tables
+CLAIM_COLUMNS_QUERY = add_columns_query(BOOKKEEPING_COLUMNS)
+
+EXISTING_COLUMNS_QUERY = """
+    SELECT column_name
+    FROM information_schema.columns
+    WHERE table_name = 'translated_articles'
+    AND table_schema = ANY(current_schemas(false));
+"""
+
+# name -> definition; built with CREATE INDEX CONCURRENTLY so startup never blocks writes
+CLAIM_INDEXES = {
+    'translated_articles_pending_idx': "ON translated_articles (utc_datetime DESC) WHERE thread_status = 'pending'",
+    'translated_articles_lease_idx': "ON translated_articles (lease_expires_at) WHERE thread_status = 'processing'",
+    'translated_articles_processed_at_idx': "ON translated_articles (processed_at) WHERE processed_at IS NOT NULL",
+}
+
+# plain build, for scratch and temp tables inside a transaction
+PENDING_INDEX_QUERY = f"CREATE INDEX IF NOT EXISTS translated_articles_pending_idx {CLAIM_INDEXES['translated_articles_pending_idx']};"
+
+INDEX_VALID_QUERY = "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s);"
+
+CLAIM_QUERY = f"""
+    UPDATE translated_articles t
+    SET thread_status = 'processing',
+        claimed_by = %s,
+        lease_expires_at = NOW() + make_interval(secs => %s)
+    FROM (
+        SELECT url
+        FROM translated_articles
+        WHERE thread_status = 'pending'
+        AND utc_datetime >= NOW() - INTERVAL '{PENDING_WINDOW}'
+        AND (next_eligible_at IS NULL OR next_eligible_at <= NOW())
+        -- oldest first, so a sustained backlog never starves rows about to leave the window
+        ORDER BY utc_datetime
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    ) claimed
+    WHERE t.url = claimed.url
+    RETURNING t.url, t.title, t.language, t.sourcecountry, t.category, t.code;
+"""
+
+PENDING_DEPTH_QUERY = f"""
+    SELECT COUNT(*)
+    FROM translated_articles
+    WHERE thread_status = 'pending'
+    AND utc_datetime >= NOW() - INTERVAL '{PENDING_WINDOW}';
+"""
+
+SET_STATUSES_QUERY = """
+    UPDATE translated_articles t
+    SET thread_status = s.status,
+        processed_at = NOW(),
+        claimed_by = NULL,
+        lease_expires_at = NULL
+    FROM UNNEST(%s::text[], %s::text[]) AS s(url, status)
+    WHERE t.url = s.url
+    AND t.thread_status = 'processing'
+    AND t.claimed_by = %s;
+"""
+
+HEARTBEAT_QUERY = """
+    UPDATE translated_articles
+    SET lease_expires_at = NOW() + make_interval(secs => %s)
+    WHERE thread_status = 'processing'
+    AND claimed_by = %s;
+"""
+
+RECORD_FAILURES_QUERY = f"""
+    UPDATE translated_articles t
+    SET {FAILED_ATTEMPT_SET},
+        last_error = f.reason
+    FROM UNNEST(%s::text[], %s::text[]) AS f(url, reason)
+    WHERE t.url = f.url
+    AND t.thread_status = 'processing'
+    AND t.claimed_by = %s;
+"""
+
+# an expired lease usually means the owner crashed mid-chunk, which poison articles can cause
+RECLAIM_EXPIRED_QUERY = f"""
+    UPDATE translated_articles t
+    SET {FAILED_ATTEMPT_SET},
+        last_error = 'lease expired'
+    WHERE t.thread_status = 'processing'
+    AND (t.lease_expires_at IS NULL OR t.lease_expires_at < NOW());
+"""
+
+FAILURE_REPORT_QUERY = """
+    SELECT thread_status, split_part(last_error, E'\\n', 1) AS reason, COUNT(*), MAX(attempts)
+    FROM translated_articles
+    WHERE last_error IS NOT NULL
+    AND thread_status IN ('pending', 'dead_letter')
+    AND utc_datetime >= NOW() - INTERVAL %s
+    GROUP BY thread_status, reason
+    ORDER BY COUNT(*) DESC
+    LIMIT %s;
+"""
+
+RELEASE_CLAIMS_QUERY = """
+    UPDATE translated_articles
+    SET thread_status = 'pending',
+        claimed_by = NULL,
+        lease_expires_at = NULL
+    WHERE url = ANY(%s)
+    AND thread_status = 'processing'
+    AND claimed_by = %s;
+"""
+
+RELEASE_OWNER_QUERY = """
+    UPDATE translated_articles
+    SET thread_status = 'pending',
+        claimed_by = NULL,
+        lease_expires_at = NULL
+    WHERE thread_status = 'processing'
+    AND claimed_by = %s;
+"""
+
+
+def owner_id():
+    """Identifies this process's claims across replicas"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def ensure_claim_indexes(cursor):
+    """Builds missing claim indexes with CREATE INDEX CONCURRENTLY; an invalid leftover of a failed build is rebuilt"""
+    conn = cursor.connection
+    conn.commit()
+    autocommit = conn.autocommit
+    conn.autocommit = True  # CONCURRENTLY cannot run inside a transaction block
+    try:
+        for name, definition in CLAIM_INDEXES.items():
+            cursor.execute(INDEX_VALID_QUERY, (name,))
+            row = cursor.fetchone()
+            if row and row[0]:
+                continue
+            if row:
+                cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name};")
+            cursor.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} {definition};")
+    finally:
+        conn.autocommit = autocommit
+
+
+def ensure_claim_schema(cursor):
+    """Adds missing claim bookkeeping columns and the partial indexes the claim, reclaim and LDA queries walk
+
+    ALTER TABLE takes an ACCESS EXCLUSIVE lock even when every column exists, so
+    it only runs for columns that are missing, and gives up after
+    SCHEMA_LOCK_TIMEOUT instead of stalling claims behind open transactions.
+    """
+    cursor.execute(EXISTING_COLUMNS_QUERY)
+    existing = {row[0] for row in cursor.fetchall()}
+    missing = [name for name in BOOKKEEPING_COLUMNS if name not in existing]
+    if missing:
+        cursor.execute("SET LOCAL lock_timeout = %s;", (SCHEMA_LOCK_TIMEOUT,))
+        cursor.execute(add_columns_query(missing))
+    cursor.connection.commit()
+    ensure_claim_indexes(cursor)
+
+
+def claim_pending_articles(cursor, owner, limit, lease_seconds=LEASE_SECONDS):
+    """Claims up to `limit` pending articles for `owner` in one round trip, leased for `lease_seconds`"""
+    if limit <= 0:
+        return []
+    cursor.execute(CLAIM_QUERY, (owner, lease_seconds, limit))
+    articles = cursor.fetchall()
+    cursor.connection.commit()
+    return articles
+
+
+def pending_depth(cursor):
+    """Pending articles inside the processing window, including ones still backing off"""
+    cursor.execute(PENDING_DEPTH_QUERY)
+    return cursor.fetchone()[0]
+
+
+def set_article_statuses(cursor, owner, statuses):
+    """Writes a {url: status} mapping for rows `owner` still holds, in one statement; the caller commits"""
+    if not statuses:
+        return 0
+    urls = list(statuses)
+    cursor.execute(SET_STATUSES_QUERY, (urls, [statuses[url] for url in urls], owner))
+    return cursor.rowcount
+
+
+def record_failures(cursor, owner, reasons):
+    """Counts a failed attempt for each {url: reason}; rows back off exponentially and are dead-lettered after MAX_ATTEMPTS; the caller commits"""
+    if not reasons:
+        return 0
+    urls = list(reasons)
+    cursor.execute(RECORD_FAILURES_QUERY, (urls, [reasons[url][:1000] for url in urls], owner))
+    return cursor.rowcount
+
+
+def split_outcomes(statuses, reason):
+    """Splits worker outcomes into judged {url: status} and failed {url: reason}"""
+    judged = {url: status for url, status in statuses.items() if status != STATUS_FAILED}
+    failed = {url: reason for url, status in statuses.items() if status == STATUS_FAILED}
+    return judged, failed
+
+
+def write_outcomes(cursor, owner, statuses, reason):
+    """Stores judged statuses and counts failures (with `reason`) for one chunk; the caller commits"""
+    judged, failed = split_outcomes(statuses, reason)
+    set_article_statuses(cursor, owner, judged)
+    record_failures(cursor, owner, failed)
+
+
+def failure_report(cursor, window='7 days', limit=10):
+    """Top failure reasons as (status, reason, articles, max attempts) rows"""
+    cursor.execute(FAILURE_REPORT_QUERY, (window, limit))
+    return cursor.fetchall()
+
+
+def extend_leases(cursor, owner, lease_seconds=LEASE_SECONDS):
+    """Pushes back the expiry of every row `owner` is processing; the caller commits"""
+    cursor.execute(HEARTBEAT_QUERY, (lease_seconds, owner))
+    return cursor.rowcount
+
+
+def reclaim_expired(cursor):
+    """Returns rows whose lease ran out (their owner died or stalled) to 'pending'; the caller commits"""
+    cursor.execute(RECLAIM_EXPIRED_QUERY)
+    return cursor.rowcount
+
+
+def release_claims(cursor, owner, urls):
+    """Returns `owner`'s unfinished claims to 'pending' without touching other replicas' rows; the caller commits"""
+    if not urls:
+        return 0
+    cursor.execute(RELEASE_CLAIMS_QUERY, (list(urls), owner))
+    return cursor.rowcount
+
+
+def release_owner(cursor, owner):
+    """Returns every row `owner` still holds to 'pending', e.g. when a drain times out; the caller commits"""
+    cursor.execute(RELEASE_OWNER_QUERY, (owner,))
+    return cursor.rowcount
@@ -0,0 +1,83 @@
+import threading
+from collections.abc import Mapping
+
+
+class ThreadCursors(Mapping):
+    """{name: cursor} mapping whose cursors belong to the calling thread
+
+    Drop-in for the fixed {'articles': cursor, 'backend': cursor} dict: every
+    thread that reads `cursors['articles']` gets a cursor on its own connection,
+    checked out of the named ConnectionPool on first use and kept for the life of
+    the thread. Connections of threads that have exited are committed and returned
+    on the next checkout; `close()` returns the rest. New code that does not need a
+    long-lived cursor should use `cursor(name)` for a short checkout instead.
+    `cursor_factories` maps pool names to a `cursor_factory` passed to
+    `connection.cursor()` for that pool's long-lived cursors.
+    """
+
+    def __init__(self, pools, cursor_factories=None):
+        self._pools = pools
+        self._cursor_factories = cursor_factories or {}
+        self._held = {}  # (thread, name) -> (checkout, cursor)
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        if name not in self._pools:
+            raise KeyError(name)
+        key = (threading.current_thread(), name)
+        with self._lock:
+            held = self._held.get(key)
+        if held is not None and not held[1].closed and not held[1].connection.closed:
+            return held[1]
+        if held is not None:
+            self._release(key)
+        self._reap()
+
+        checkout = self._pools[name].connection()
+        conn = checkout.__enter__()
+        cursor_factory = self._cursor_factories.get(name)
+        cursor = conn.cursor(cursor_factory=cursor_factory) if cursor_factory else conn.cursor()
+        with self._lock:
+            self._held[key] = (checkout, cursor)
+        return cursor
+
+    def __iter__(self):
+        return iter(self._pools)
+
+    def __len__(self):
+        return len(self._pools)
+
+    def cursor(self, name):
+        """Short-lived pooled cursor for one unit of work; commits on success"""
+        return self._pools[name].cursor()
+
+    def _release(self, key):
+        with self._lock:
+            held = self._held.pop(key, None)
+        if held is None:
+            return
+        checkout, cursor = held
+        if not cursor.closed:
+            cursor.close()
+        checkout.__exit__(None, None, None)
+
+    def _reap(self):
+        with self._lock:
+            finished = [key for key in self._held if not key[0].is_alive()]
+        for key in finished:
+            self._release(key)
+
+    def release(self):
+        """Commits and returns the calling thread's connections"""
+        current = threading.current_thread()
+        with self._lock:
+            mine = [key for key in self._held if key[0] is current]
+        for key in mine:
+            self._release(key)
+
+    def close(self):
+        """Commits and returns every held connection, e.g. after the workers have stopped"""
+        with self._lock:
+            keys = list(self._held)
+        for key in keys:
+            self._release(key)
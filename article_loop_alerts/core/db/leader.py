@@ -0,0 +1,59 @@
+import zlib
+import psycopg2
+
+LOCK_NAMESPACE = 'article_loop'
+
+
+def lock_key(name):
+    """Stable advisory-lock key for `name`, shared by every replica"""
+    return zlib.crc32(f"{LOCK_NAMESPACE}:{name}".encode())
+
+
+class LeaderLock:
+    """Leader election over a session-level Postgres advisory lock
+
+    The lock lives on a dedicated connection, so it is released by the server as soon
+    as the holder exits or its connection drops, on any node. Nothing to clean up.
+    """
+
+    def __init__(self, dsn, name):
+        self.dsn = dsn
+        self.name = name
+        self.key = lock_key(name)
+        self._conn = None
+        self.held = False
+
+    def _alive(self):
+        if self._conn is None or self._conn.closed:
+            return False
+        try:
+            with self._conn.cursor() as cursor:
+                cursor.execute("SELECT 1;")
+            return True
+        except psycopg2.Error:
+            return False
+
+    def acquire(self):
+        """Returns True while this process is the leader; safe to call every cycle"""
+        if self.held and self._alive():
+            return True
+        self.close()
+        try:
+            self._conn = psycopg2.connect(self.dsn)
+            self._conn.set_session(autocommit=True)
+            with self._conn.cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_lock(%s);", (self.key,))
+                self.held = cursor.fetchone()[0]
+        except psycopg2.Error as e:
+            print(f"Leader election for {self.name} failed: {e}")
+            self.close()
+        if not self.held:
+            self.close()
+        return self.held
+
+    def close(self):
+        """Gives up leadership; closing the session releases the lock"""
+        if self._conn is not None and not self._conn.closed:
+            self._conn.close()
+        self._conn = None
+        self.held = False
@@ -0,0 +1,35 @@
+import threading
+from core.db.claims import LEASE_SECONDS, extend_leases
+
+
+class LeaseHeartbeat:
+    """Keeps an owner's claims alive while it works; use as a context manager around a processing cycle"""
+
+    def __init__(self, owner, cursor_factory, lease_seconds=LEASE_SECONDS, interval=None):
+        self.owner = owner
+        self.cursor_factory = cursor_factory
+        self.lease_seconds = lease_seconds
+        self.interval = interval or lease_seconds / 3
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _beat(self):
+        while not self._stop.wait(self.interval):
+            try:
+                with self.cursor_factory() as cursor:
+                    extended = extend_leases(cursor, self.owner, self.lease_seconds)
+                print(f"Heartbeat: extended {extended} leases for {self.owner}")
+            except Exception as e:
+                # a missed beat is fine as long as the next one lands before expiry
+                print(f"Heartbeat failed: {e}")
+
+    def __enter__(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._beat, name="lease-heartbeat", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
@@ -0,0 +1,101 @@
+import time
+import select
+import psycopg2
+
+PENDING_CHANNEL = 'translated_articles_pending'
+POLL_STEP = 1  # seconds between shutdown checks while waiting
+RECONNECT_BACKOFF = 5  # first retry after a listener error; doubles per failure
+RECONNECT_BACKOFF_MAX = 300
+
+
+def notify_pending(cursor, payload=''):
+    """Queues a notification that is delivered when the caller's transaction commits"""
+    cursor.execute("SELECT pg_notify(%s, %s);", (PENDING_CHANNEL, payload))
+
+
+class PendingListener:
+    """Blocks until new pending articles are announced, the fallback interval expires or shutdown is requested"""
+
+    def __init__(self, dsn, channel=PENDING_CHANNEL, debounce=5):
+        self.dsn = dsn
+        self.channel = channel
+        self.debounce = debounce
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is not None and not self._conn.closed:
+            return self._conn
+        self._conn = psycopg2.connect(self.dsn)
+        self._conn.set_session(autocommit=True)
+        with self._conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {self.channel};")
+        return self._conn
+
+    def listen(self):
+        """Subscribes up front so notifications sent during the first run are not missed"""
+        try:
+            self._connect()
+        except psycopg2.Error as e:
+            print(f"Listener could not subscribe, will retry on wait: {e}")
+
+    def _drain(self, conn):
+        conn.poll()
+        payloads = [n.payload for n in conn.notifies]
+        conn.notifies.clear()
+        return payloads
+
+    def _wait_readable(self, timeout, should_continue):
+        """Returns notification payloads, or [] when `timeout` passes or shutdown is requested"""
+        deadline = time.monotonic() + timeout
+        while should_continue():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return []
+            conn = self._connect()
+            payloads = self._drain(conn)
+            if payloads:
+                return payloads
+            select.select([conn], [], [], min(POLL_STEP, remaining))
+        return []
+
+    def _sleep(self, seconds, should_continue):
+        deadline = time.monotonic() + seconds
+        while should_continue() and time.monotonic() < deadline:
+            time.sleep(min(POLL_STEP, max(0, deadline - time.monotonic())))
+
+    def wait(self, timeout, should_continue=lambda: True):
+        """Returns the categories announced (possibly empty) or None when the wait ended without a notification
+
+        A listener error is retried after a short, doubling backoff rather than
+        sleeping out `timeout`. Announcements sent while disconnected are lost, so
+        a successful reconnect returns an empty set to wake the caller.
+        """
+        deadline = time.monotonic() + timeout
+        backoff = RECONNECT_BACKOFF
+        while should_continue():
+            try:
+                payloads = self._wait_readable(deadline - time.monotonic(), should_continue)
+                if not payloads:
+                    return None
+                # a fetch cycle commits one category at a time; let the burst settle before waking the caller
+                self._sleep(self.debounce, should_continue)
+                payloads += self._drain(self._connect())
+                return {payload for payload in payloads if payload}
+            except psycopg2.Error as e:
+                self.close()
+                delay = min(backoff, max(0, deadline - time.monotonic()))
+                print(f"Listener error, reconnecting in {delay:.0f}s: {e}")
+                self._sleep(delay, should_continue)
+                backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX)
+                try:
+                    self._connect()
+                except psycopg2.Error:
+                    continue
+                print("Listener reconnected")
+                return set()
+        return None
+
+    def close(self):
+        if self._conn is not None and not self._conn.closed:
+            self._conn.close()
+        self._conn = None
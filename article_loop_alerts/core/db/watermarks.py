@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+from psycopg2.extras import execute_values
+
+WATERMARK_TABLE_QUERY = """
+    CREATE TABLE IF NOT EXISTS fetch_watermarks (
+        category text NOT NULL,
+        code text NOT NULL,
+        fetched_until timestamptz NOT NULL,
+        updated_at timestamptz NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (category, code)
+    );
+"""
+
+ADVANCE_WATERMARKS_QUERY = """
+    INSERT INTO fetch_watermarks (category, code, fetched_until)
+    VALUES %s
+    ON CONFLICT (category, code) DO UPDATE
+    SET fetched_until = GREATEST(fetch_watermarks.fetched_until, EXCLUDED.fetched_until),
+        updated_at = NOW();
+"""
+
+OLDEST_WATERMARK_QUERY = """
+    SELECT MIN(w.fetched_until)
+    FROM fetch_watermarks w
+    JOIN UNNEST(%s::text[], %s::text[]) AS configured (category, code)
+    ON w.category = configured.category AND w.code = configured.code;
+"""
+
+MAX_LOOKBACK = timedelta(days=2)  # the processing window; older gaps are not refetched
+
+
+def ensure_watermark_table(cursor):
+    cursor.execute(WATERMARK_TABLE_QUERY)
+    cursor.connection.commit()
+
+
+def load_watermarks(cursor):
+    """Returns {(category, code): fetched_until} in UTC"""
+    cursor.execute("SELECT category, code, fetched_until FROM fetch_watermarks;")
+    return {
+        (category, code): fetched_until.astimezone(timezone.utc)
+        for category, code, fetched_until in cursor.fetchall()
+    }
+
+
+def oldest_watermark(cursor, codes, max_lookback=MAX_LOOKBACK):
+    """Oldest watermark among the configured (category, code) pairs, no older than `max_lookback`, or None
+
+    Watermarks of codes since dropped from the config are ignored; they never advance.
+    """
+    if not codes:
+        return None
+    categories, code_values = zip(*codes)
+    cursor.execute(OLDEST_WATERMARK_QUERY, (list(categories), list(code_values)))
+    oldest = cursor.fetchone()[0]
+    if oldest is None:
+        return None
+    return max(oldest.astimezone(timezone.utc), datetime.now(timezone.utc) - max_lookback)
+
+
+def advance_watermarks(cursor, category, codes, fetched_until):
+    """Moves the watermarks of `codes` forward to `fetched_until`, never backwards; the caller commits"""
+    if not codes:
+        return
+    execute_values(cursor, ADVANCE_WATERMARKS_QUERY, [(category, code, fetched_until) for code in codes])
+
+
+def fetch_window(watermark, now, default_lookback, max_lookback):
+    """Start/end of the next incremental fetch for one code
+
+    Codes without a watermark look back `default_lookback`; codes whose watermark is
+    older than `max_lookback` resume from there, since anything older is outside the
+    processing window anyway.
+    """
+    if watermark is None:
+        return now - default_lookback, now
+    return max(watermark, now - max_lookback), now
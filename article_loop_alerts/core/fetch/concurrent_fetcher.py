@@ -0,0 +1,54 @@
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class ConcurrentFetcher:
+    """Fetches every (category, code) pair in parallel under a shared rate limit
+
+    `fetch(category, code)` returns a DataFrame. Each category's frames and the codes
+    that fetched without error are handed to `on_category(category, frames, codes)` on
+    the calling thread as soon as its last code finishes, so inserts start while other
+    categories are still downloading.
+    """
+
+    def __init__(self, fetch, bucket, parallelism=8, should_continue=lambda: True):
+        self.fetch = fetch
+        self.bucket = bucket
+        self.parallelism = parallelism
+        self.should_continue = should_continue
+
+    def _fetch_one(self, category, code):
+        if not self.bucket.acquire(self.should_continue):
+            return None
+        return self.fetch(category, code)
+
+    def run(self, codes_by_category, on_category):
+        """Returns {'requests', 'errors', 'seconds'} for the cycle"""
+        start = time.monotonic()
+        remaining = {category: len(codes) for category, codes in codes_by_category.items() if codes}
+        frames = defaultdict(list)
+        succeeded = defaultdict(list)
+        errors = 0
+        with ThreadPoolExecutor(max_workers=self.parallelism, thread_name_prefix="fetch") as executor:
+            futures = {
+                executor.submit(self._fetch_one, category, code): (category, code)
+                for category, codes in codes_by_category.items()
+                for code in codes
+            }
+            for future in as_completed(futures):
+                category, code = futures[future]
+                try:
+                    result = future.result()
+                    if result is not None:
+                        succeeded[category].append(code)
+                        if not result.empty:
+                            frames[category].append(result)
+                except Exception as e:
+                    errors += 1
+                    print(f"Fetch error - {category}/{code}: {e}")
+                remaining[category] -= 1
+                # still hand over on shutdown: completed downloads are inserted, aborted codes keep their watermark
+                if remaining[category] == 0:
+                    on_category(category, frames.pop(category, []), succeeded.pop(category, []))
+        return {'requests': len(futures), 'errors': errors, 'seconds': time.monotonic() - start}
@@ -0,0 +1,79 @@
+import time
+import threading
+from collections import OrderedDict
+
+WARM_QUERY = """
+    SELECT url, utc_datetime
+    FROM translated_articles
+    WHERE utc_datetime >= NOW() - INTERVAL '2 days'
+    ORDER BY utc_datetime DESC
+    LIMIT %s;
+"""
+
+
+class SeenUrls:
+    """Bounded LRU set of recently inserted urls with a TTL, used to drop duplicates before they reach the database"""
+
+    def __init__(self, max_size=500000, ttl=2 * 86400):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+
+    def warm(self, conn):
+        """Loads the newest `max_size` urls of the processing window through a server-side cursor"""
+        with conn.cursor(name='seen_urls_warm') as cursor:
+            cursor.itersize = 10000
+            cursor.execute(WARM_QUERY, (self.max_size,))
+            rows = [(url, utc_datetime.timestamp()) for url, utc_datetime in cursor]
+        with self._lock:
+            for url, stamp in reversed(rows):
+                self._seen[url] = stamp
+                self._seen.move_to_end(url)
+        return len(rows)
+
+    def _contains(self, url, now):
+        stamp = self._seen.get(url)
+        if stamp is None:
+            return False
+        if now - stamp > self.ttl:
+            del self._seen[url]
+            return False
+        self._seen.move_to_end(url)
+        return True
+
+    def filter(self, df, column='url'):
+        """Drops rows whose url was inserted recently or repeats earlier in `df`"""
+        now = time.time()
+        unique = df.drop_duplicates(subset=column)
+        with self._lock:
+            fresh = [not self._contains(url, now) for url in unique[column]]
+        kept = unique[fresh]
+        with self._lock:
+            self.lookups += len(df)
+            self.hits += len(df) - len(kept)
+        return kept
+
+    def remember(self, urls):
+        """Marks `urls` as seen; call only after the insert has committed"""
+        now = time.time()
+        with self._lock:
+            for url in urls:
+                self._seen[url] = now
+                self._seen.move_to_end(url)
+            while len(self._seen) > self.max_size:
+                self._seen.popitem(last=False)
+
+    def hit_rate(self):
+        with self._lock:
+            return self.hits / self.lookups if self.lookups else 0.0
+
+    def reset_stats(self):
+        with self._lock:
+            self.lookups = 0
+            self.hits = 0
+
+    def __len__(self):
+        return len(self._seen)
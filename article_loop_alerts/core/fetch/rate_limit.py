@@ -0,0 +1,45 @@
+import time
+import threading
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursting up to `capacity`"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self):
+        """Takes a token if one is available, else returns the seconds until the next one"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, should_continue=lambda: True, max_sleep=1):
+        """Blocks until a token is available; returns False if should_continue() turns false first"""
+        while should_continue():
+            delay = self._take()
+            if delay == 0:
+                return True
+            time.sleep(min(delay, max_sleep))
+        return False
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(upstream, rate, capacity=1):
+    """Returns the process-wide bucket for `upstream`, creating it on first use"""
+    with _buckets_lock:
+        if upstream not in _buckets:
+            _buckets[upstream] = TokenBucket(rate, capacity)
+        return _buckets[upstream]
@@ -0,0 +1,109 @@
+import time
+import threading
+from contextlib import contextmanager
+from core.metrics.registry import REGISTRY
+from core.processing.controller import is_throttle
+
+CLAIM_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CHUNK_BUCKETS = (1, 5, 15, 30, 60, 120, 180, 300, 600, 1200)
+JOB_BUCKETS = (0.1, 1, 5, 15, 60, 300, 900, 1800, 3600, 7200)
+QUEUE_DEPTH_INTERVAL = 30  # the count walks the pending partial index; scrapes in between reuse it
+
+PENDING_DEPTH = REGISTRY.gauge('article_loop_pending_articles', 'Pending articles inside the processing window')
+CLAIM_SECONDS = REGISTRY.histogram('article_loop_claim_seconds', 'Latency of one claim query', CLAIM_BUCKETS)
+CLAIMED = REGISTRY.counter('article_loop_articles_claimed_total', 'Articles claimed by this replica')
+CHUNK_SECONDS = REGISTRY.histogram('article_loop_chunk_seconds', 'Wall time to extract, insert and record one chunk', CHUNK_BUCKETS)
+LLM_SECONDS = REGISTRY.histogram('article_loop_llm_seconds', 'extract_translate latency per chunk', CHUNK_BUCKETS)
+LLM_ERRORS = REGISTRY.counter('article_loop_llm_errors_total', 'extract_translate calls that raised, by kind')
+INSERTED = REGISTRY.counter('article_loop_articles_inserted_total', 'Fetched articles inserted as pending')
+LAST_FETCH_INSERTED = REGISTRY.gauge('article_loop_last_fetch_inserted', 'Articles inserted per category by the last fetch cycle')
+WORKERS_BUSY = REGISTRY.gauge('article_loop_workers_busy', 'Chunks currently being processed')
+WORKERS_TARGET = REGISTRY.gauge('article_loop_workers_target', 'Worker count set by the adaptive controller')
+BATCH_SIZE = REGISTRY.gauge('article_loop_batch_size', 'Chunk size set by the adaptive controller')
+POOL_WAIT = REGISTRY.counter('article_loop_db_pool_wait_seconds_total', 'Time spent waiting for a pooled connection')
+POOL_CHECKOUTS = REGISTRY.counter('article_loop_db_pool_checkouts_total', 'Pooled connection checkouts')
+POOL_TIMEOUTS = REGISTRY.counter('article_loop_db_pool_timeouts_total', 'Checkouts that gave up waiting')
+POOL_WAIT_MAX = REGISTRY.gauge('article_loop_db_pool_wait_max_seconds', 'Longest single wait for a pooled connection')
+POOL_IN_USE = REGISTRY.gauge('article_loop_db_pool_in_use', 'Pooled connections checked out')
+POOL_SIZE = REGISTRY.gauge('article_loop_db_pool_size', 'Pool capacity')
+JOB_SECONDS = REGISTRY.histogram('article_loop_job_seconds', 'Wall time of one scheduled job run', JOB_BUCKETS)
+JOB_FAILURES = REGISTRY.counter('article_loop_job_failures_total', 'Scheduled job runs that raised')
+JOB_MISSED = REGISTRY.counter('article_loop_job_missed_total', 'Job deadlines that passed while the job was still running')
+JOB_SKIPPED = REGISTRY.counter('article_loop_job_skipped_total', 'Job deadlines skipped because the previous run overlapped them')
+JOB_RUNNING = REGISTRY.gauge('article_loop_job_running', 'Whether the job is running right now')
+
+
+@contextmanager
+def track_chunk(category):
+    """Counts the chunk as a busy worker and times it"""
+    with WORKERS_BUSY.track_in_progress(), CHUNK_SECONDS.time(category=category):
+        yield
+
+
+@contextmanager
+def track_llm(category):
+    """Times one extract_translate call and counts its failures as throttle or error"""
+    start = time.monotonic()
+    try:
+        yield
+    except Exception as e:
+        LLM_ERRORS.inc(category=category, kind='throttle' if is_throttle(e) else 'error')
+        raise
+    finally:
+        LLM_SECONDS.observe(time.monotonic() - start, category=category)
+
+
+def record_fetch(inserted):
+    """Publishes one fetch cycle's {category: inserted} counts"""
+    for category, count in inserted.items():
+        INSERTED.inc(count, category=category)
+        LAST_FETCH_INSERTED.set(count, category=category)
+
+
+def record_controller(controller):
+    WORKERS_TARGET.set(controller.workers)
+    BATCH_SIZE.set(controller.batch_size)
+
+
+def watch_pools(pools):
+    """Mirrors ConnectionPool.metrics() for each {name: pool_factory} on every scrape"""
+    def collect():
+        for name, pool in pools.items():
+            stats = pool().metrics()
+            POOL_WAIT.set_total(stats['wait_total'], pool=name)
+            POOL_CHECKOUTS.set_total(stats['checkouts'], pool=name)
+            POOL_TIMEOUTS.set_total(stats['timeouts'], pool=name)
+            POOL_WAIT_MAX.set(stats['wait_max'], pool=name)
+            POOL_IN_USE.set(stats['in_use'], pool=name)
+            POOL_SIZE.set(stats['size'], pool=name)
+    REGISTRY.on_collect(collect)
+
+
+def watch_pending_depth(count_pending):
+    """Refreshes the queue-depth gauge from `count_pending()` at most every QUEUE_DEPTH_INTERVAL seconds"""
+    state = {'at': 0.0}
+    lock = threading.Lock()
+
+    def collect():
+        with lock:
+            if time.monotonic() - state['at'] < QUEUE_DEPTH_INTERVAL:
+                return
+            state['at'] = time.monotonic()
+        PENDING_DEPTH.set(count_pending())
+    REGISTRY.on_collect(collect)
+
+
+def watch_scheduler(scheduler):
+    """Times every job run and mirrors Scheduler.metrics() counters on every scrape"""
+    def observe(name, duration, failed):
+        JOB_SECONDS.observe(duration, job=name)
+        if failed:
+            JOB_FAILURES.inc(job=name)
+
+    def collect():
+        for name, stats in scheduler.metrics().items():
+            JOB_MISSED.set_total(stats['missed'], job=name)
+            JOB_SKIPPED.set_total(stats['skipped_overlap'], job=name)
+            JOB_RUNNING.set(int(stats['running']), job=name)
+    scheduler.on_run(observe)
+    REGISTRY.on_collect(collect)
@@ -0,0 +1,118 @@
+import time
+import threading
+from contextlib import contextmanager
+
+THROTTLE_MARKERS = ('429', 'too many requests', 'rate limit')
+
+
+def is_throttle(error):
+    """True when an LLM call failed because the endpoint is shedding load"""
+    response = getattr(error, 'response', None)
+    status = getattr(error, 'status_code', None) or getattr(response, 'status_code', None)
+    if status == 429:
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in THROTTLE_MARKERS)
+
+
+class AdaptiveController:
+    """AIMD controller for worker count and chunk size
+
+    Workers grow additively while a backlog remains and the endpoint looks healthy,
+    and shrink multiplicatively on 429s, errors, or per-article latency drifting well
+    above the best latency seen, which usually precedes load shedding. Chunk size
+    follows latency so that one chunk takes roughly `target_chunk_seconds`.
+    """
+
+    def __init__(self, workers, batch_size, min_workers=1, max_workers=45, min_batch=5, max_batch=100,
+                 target_chunk_seconds=120, increase_step=2, throttle_threshold=0.02, error_threshold=0.1,
+                 latency_tolerance=2.0):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.target_chunk_seconds = target_chunk_seconds
+        self.increase_step = increase_step
+        self.throttle_threshold = throttle_threshold
+        self.error_threshold = error_threshold
+        self.latency_tolerance = latency_tolerance
+        self.baseline_latency = None
+        self.last_decision = 'start'
+        self._lock = threading.Lock()
+        self._reset_window()
+
+    def _reset_window(self):
+        self._chunks = 0
+        self._errors = 0
+        self._throttled = 0
+        self._articles = 0
+        self._seconds = 0.0
+
+    def observe(self, articles, seconds, error=None):
+        with self._lock:
+            self._chunks += 1
+            if error is None:
+                self._articles += articles
+                self._seconds += seconds
+            elif is_throttle(error):
+                self._throttled += 1
+            else:
+                self._errors += 1
+
+    @contextmanager
+    def track(self, articles):
+        """Times a chunk and records its outcome; exceptions are re-raised"""
+        start = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self.observe(articles, time.monotonic() - start, e)
+            raise
+        self.observe(articles, time.monotonic() - start)
+
+    def _clamp_workers(self, workers):
+        return max(self.min_workers, min(self.max_workers, int(workers)))
+
+    def update(self, claimed, claim_limit):
+        """Moves the setpoints using the window since the last update; call once per cycle"""
+        with self._lock:
+            backlog = claimed >= claim_limit
+            latency = self._seconds / self._articles if self._articles else None
+            throttle_rate = self._throttled / self._chunks if self._chunks else 0.0
+            error_rate = self._errors / self._chunks if self._chunks else 0.0
+
+            if throttle_rate > self.throttle_threshold:
+                self.workers = self._clamp_workers(self.workers * 0.5)
+                self.last_decision = f'throttled {throttle_rate:.0%}'
+            elif error_rate > self.error_threshold:
+                self.workers = self._clamp_workers(self.workers * 0.75)
+                self.last_decision = f'errors {error_rate:.0%}'
+            elif latency and self.baseline_latency and latency > self.baseline_latency * self.latency_tolerance:
+                self.workers = self._clamp_workers(self.workers * 0.8)
+                self.last_decision = f'latency {latency:.1f}s/article'
+            elif backlog:
+                self.workers = self._clamp_workers(self.workers + self.increase_step)
+                self.last_decision = 'backlog'
+            else:
+                self.last_decision = 'hold'
+
+            if latency:
+                # the baseline creeps up 5% per cycle so a permanently slower endpoint is eventually accepted
+                self.baseline_latency = latency if self.baseline_latency is None else min(self.baseline_latency * 1.05, latency)
+                self.batch_size = max(self.min_batch, min(self.max_batch, round(self.target_chunk_seconds / latency)))
+
+            self._reset_window()
+            return self.snapshot(latency, throttle_rate, error_rate)
+
+    def snapshot(self, latency=None, throttle_rate=0.0, error_rate=0.0):
+        return {
+            'workers': self.workers,
+            'batch_size': self.batch_size,
+            'latency_per_article': latency,
+            'baseline_latency': self.baseline_latency,
+            'throttle_rate': throttle_rate,
+            'error_rate': error_rate,
+            'decision': self.last_decision,
+        }
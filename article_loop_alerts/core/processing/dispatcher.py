@@ -0,0 +1,81 @@
+from itertools import count
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+CATEGORY_INDEX = 4  # category position in the claimed article tuple
+
+
+def group_by_category(articles, batch_size):
+    """Splits claimed rows into category-homogeneous chunks of at most `batch_size`"""
+    by_category = defaultdict(list)
+    for article in articles:
+        by_category[article[CATEGORY_INDEX]].append(article)
+    return {
+        category: [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+        for category, rows in by_category.items()
+    }
+
+
+class CategoryDispatcher:
+    """Runs claimed chunks on `total_workers` threads, sharing them fairly across categories
+
+    Each free worker takes the next chunk of the category with the fewest
+    chunks running, so categories get an equal share while they all have work,
+    and a slot freed by a finished category goes to whichever categories still
+    have chunks queued. An optional per-category `max_workers` in
+    gcam_config.json caps how many of a category's chunks run at once.
+    """
+
+    def __init__(self, worker, total_workers, limits=None, should_continue=lambda: True):
+        self.worker = worker
+        self.total_workers = total_workers
+        self.limits = limits or {}
+        self.should_continue = should_continue
+
+    def _next_category(self, queued, active, total_workers):
+        """Queued category with the fewest running chunks that is under its limit, or None"""
+        eligible = [
+            category for category in queued
+            if active[category] < (self.limits.get(category) or total_workers)
+        ]
+        return min(eligible, key=lambda category: active[category], default=None)
+
+    def run(self, chunks_by_category, prompt_for):
+        """Runs every chunk as worker(chunk, prompt, chunk_id) and waits; queued chunks are dropped once should_continue() turns false
+
+        Returns {category: most chunks it had running at once}.
+        """
+        total_workers = max(1, self.total_workers)
+        queued = {category: deque(chunks) for category, chunks in chunks_by_category.items() if chunks}
+        prompts = {category: prompt_for(category) for category in queued}
+        for category, chunks in queued.items():
+            print(f"{category}: {len(chunks)} chunks")
+        running = {}  # future -> category
+        active = defaultdict(int)
+        peak = defaultdict(int)
+        chunk_ids = count()
+        with ThreadPoolExecutor(max_workers=total_workers, thread_name_prefix="dispatch") as executor:
+            try:
+                while True:
+                    while len(running) < total_workers and self.should_continue():
+                        category = self._next_category(queued, active, total_workers)
+                        if category is None:
+                            break
+                        chunk = queued[category].popleft()
+                        if not queued[category]:
+                            del queued[category]
+                        running[executor.submit(self.worker, chunk, prompts[category], next(chunk_ids))] = category
+                        active[category] += 1
+                        peak[category] = max(peak[category], active[category])
+                    if not self.should_continue():
+                        queued.clear()
+                    if not running:
+                        break
+                    done, _ = wait(running, timeout=1, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        active[running.pop(future)] -= 1
+            except BaseException:
+                for future in running:
+                    future.cancel()
+                raise
+        return dict(peak)
@@ -0,0 +1,34 @@
+from core.metrics.registry import REGISTRY
+
+CLUSTER_SIZE = REGISTRY.histogram(
+    'article_loop_near_duplicate_cluster_size', 'Articles per near-duplicate cluster in a claimed batch',
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100)
+)
+NEAR_DUPLICATES = REGISTRY.counter(
+    'article_loop_near_duplicates_total', 'Claimed articles queued behind a near-duplicate instead of going straight to the LLM'
+)
+
+
+def cluster_by_key(articles, key_for):
+    """Splits a claimed batch into (leaders, followers) by result-cache key
+
+    The key covers the story segment of the title (see story_title), so
+    syndicated copies that differ only in site furniture share one. Leaders are
+    the first article of each key, or are not cacheable; followers repeat an
+    earlier key, so processing them after the leaders lets them reuse its cached
+    result instead of calling the LLM.
+    """
+    leaders, followers = [], []
+    sizes = {}
+    for article in articles:
+        key = key_for(article)
+        if key is not None and key in sizes:
+            followers.append(article)
+        else:
+            leaders.append(article)
+        if key is not None:
+            sizes[key] = sizes.get(key, 0) + 1
+    for size in sizes.values():
+        CLUSTER_SIZE.observe(size)
+    NEAR_DUPLICATES.inc(len(followers))
+    return leaders, followers
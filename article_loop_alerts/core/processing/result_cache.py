@@ -0,0 +1,186 @@
+import json
+import hashlib
+import threading
+import pandas as pd
+from core.metrics.registry import REGISTRY
+from core.processing.titles import story_title
+
+CACHE_VERSION = 2  # bump when extract_translate's output or the key material changes shape or meaning
+IDENTITY_COLUMNS = ['url', 'title', 'language', 'sourcecountry', 'category', 'code']
+MIN_TITLE_CHARS = 24  # shorter titles ("Home", "Latest news") are too generic to share results
+
+CACHE_LOOKUPS = REGISTRY.counter('article_loop_llm_cache_lookups_total', 'Articles checked against the LLM result cache, by outcome')
+
+RESULT_CACHE_TABLE_QUERY = """
+    CREATE TABLE IF NOT EXISTS llm_result_cache (
+        key text PRIMARY KEY,
+        result jsonb NOT NULL,
+        hits integer NOT NULL DEFAULT 0,
+        created_at timestamptz NOT NULL DEFAULT NOW(),
+        used_at timestamptz NOT NULL DEFAULT NOW()
+    );
+"""
+
+RESULT_CACHE_INDEX_QUERY = """
+    CREATE INDEX IF NOT EXISTS llm_result_cache_used_at_idx
+    ON llm_result_cache (used_at);
+"""
+
+# the touch keeps recently reused entries clear of size eviction
+LOOKUP_QUERY = """
+    UPDATE llm_result_cache
+    SET hits = hits + 1, used_at = NOW()
+    WHERE key = ANY(%s)
+    AND created_at >= NOW() - make_interval(secs => %s)
+    RETURNING key, result;
+"""
+
+STORE_QUERY = """
+    INSERT INTO llm_result_cache (key, result)
+    SELECT * FROM UNNEST(%s::text[], %s::jsonb[])
+    ON CONFLICT (key) DO UPDATE
+    SET result = EXCLUDED.result, created_at = NOW(), used_at = NOW();
+"""
+
+EVICT_EXPIRED_QUERY = """
+    DELETE FROM llm_result_cache
+    WHERE created_at < NOW() - make_interval(secs => %s);
+"""
+
+EVICT_OVERFLOW_QUERY = """
+    DELETE FROM llm_result_cache
+    WHERE key IN (
+        SELECT key
+        FROM llm_result_cache
+        ORDER BY used_at DESC
+        OFFSET %s
+    );
+"""
+
+
+def ensure_result_cache_table(cursor):
+    cursor.execute(RESULT_CACHE_TABLE_QUERY)
+    cursor.execute(RESULT_CACHE_INDEX_QUERY)
+    cursor.connection.commit()
+
+
+class CachePlan:
+    """One chunk split into cache hits, articles to send to the LLM, and in-chunk duplicates of those"""
+
+    def __init__(self, keys, hits):
+        self.keys = keys
+        self.hits = hits
+        self.pending = []
+        self.followers = []
+
+    def results_by_key(self, processed_articles):
+        """{key: result columns} for the LLM rows that may be cached"""
+        if processed_articles.empty:
+            return {}
+        extra = processed_articles.drop(columns=[c for c in IDENTITY_COLUMNS if c in processed_articles.columns])
+        results = json.loads(extra.to_json(orient='records', date_format='iso'))
+        return {
+            self.keys[url]: result
+            for url, result in zip(processed_articles['url'], results)
+            if self.keys.get(url)
+        }
+
+    def combine(self, processed_articles):
+        """LLM rows plus rows rebuilt from cached and representative results, one per answered article"""
+        results = self.results_by_key(processed_articles)
+        rows = processed_articles.to_dict('records') if not processed_articles.empty else []
+        for article in self.followers:
+            key = self.keys[article[0]]
+            if key in results:
+                rows.append({**results[key], **dict(zip(IDENTITY_COLUMNS, article))})
+        for article, result in self.hits:
+            rows.append({**result, **dict(zip(IDENTITY_COLUMNS, article))})
+        if not rows:
+            return processed_articles
+        combined = pd.DataFrame(rows)
+        if not processed_articles.empty:
+            combined = combined.reindex(columns=processed_articles.columns)
+        return combined
+
+
+class ResultCache:
+    """Persistent extract_translate results keyed on the story part of the title, source and prompt
+
+    Syndicated copies of a story carry the same title under different urls, often
+    with a different site name around it; they share one LLM call per prompt
+    version. Articles are only cached when their story is long enough to be
+    specific.
+    """
+
+    def __init__(self, ttl=7 * 86400, max_entries=1000000, min_title_chars=MIN_TITLE_CHARS):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.min_title_chars = min_title_chars
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+
+    def key(self, article, prompt):
+        """Cache key for a claimed (url, title, language, sourcecountry, category, code) row, or None"""
+        _, title, language, sourcecountry, category, _ = article
+        title = story_title(title)
+        if len(title) < self.min_title_chars:
+            return None
+        prompt_version = hashlib.sha256(prompt.encode()).hexdigest()[:16]
+        material = '\x00'.join([str(CACHE_VERSION), prompt_version, category or '', language or '', sourcecountry or '', title])
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def plan(self, cursor, articles_chunk, prompt):
+        """Looks the chunk up in one round trip and picks one representative per uncached key"""
+        keys = {article[0]: self.key(article, prompt) for article in articles_chunk}
+        wanted = list({key for key in keys.values() if key})
+        cached = {}
+        if wanted:
+            cursor.execute(LOOKUP_QUERY, (wanted, self.ttl))
+            cached = dict(cursor.fetchall())
+
+        plan = CachePlan(keys, [])
+        representatives = set()
+        for article in articles_chunk:
+            key = keys[article[0]]
+            if key in cached:
+                plan.hits.append((article, cached[key]))
+            elif key in representatives:
+                plan.followers.append(article)
+            else:
+                if key:
+                    representatives.add(key)
+                plan.pending.append(article)
+
+        CACHE_LOOKUPS.inc(len(plan.hits), outcome='hit')
+        CACHE_LOOKUPS.inc(len(plan.followers), outcome='duplicate')
+        CACHE_LOOKUPS.inc(len(plan.pending), outcome='miss')
+        with self._lock:
+            self.lookups += len(articles_chunk)
+            self.hits += len(plan.hits) + len(plan.followers)
+        return plan
+
+    def store(self, cursor, plan, processed_articles):
+        """Caches the LLM's rows for cacheable articles; articles it did not return are not cached"""
+        results = plan.results_by_key(processed_articles)
+        if not results:
+            return 0
+        keys = list(results)
+        cursor.execute(STORE_QUERY, (keys, [json.dumps(results[key]) for key in keys]))
+        return len(keys)
+
+    def evict(self, cursor):
+        """Drops entries older than the TTL, then the least recently used beyond `max_entries`; the caller commits"""
+        cursor.execute(EVICT_EXPIRED_QUERY, (self.ttl,))
+        expired = cursor.rowcount
+        cursor.execute(EVICT_OVERFLOW_QUERY, (self.max_entries,))
+        return expired + cursor.rowcount
+
+    def hit_rate(self):
+        with self._lock:
+            return self.hits / self.lookups if self.lookups else 0.0
+
+    def reset_stats(self):
+        with self._lock:
+            self.lookups = 0
+            self.hits = 0
@@ -0,0 +1,17 @@
+import re
+import unicodedata
+
+# "Plastic waste | Title - La Provincia": the longest segment is the story, the rest is site furniture
+TITLE_SEPARATORS = re.compile(r'\s+[|\-–—:·]\s+')
+
+
+def normalize_title(title):
+    """Case-, width- and punctuation-insensitive form of a title"""
+    title = unicodedata.normalize('NFKC', title or '').casefold()
+    return ' '.join(re.sub(r'[\W_]+', ' ', title).split())
+
+
+def story_title(title):
+    """Normalized longest separator-delimited segment of `title`"""
+    segments = TITLE_SEPARATORS.split(title or '')
+    return normalize_title(max(segments, key=len))
@@ -0,0 +1,70 @@
+import time
+import threading
+
+
+class AdaptiveWait:
+    """Poll interval that follows the article arrival rate
+
+    `sample()` returns (articles arrived so far, current backlog). The interval
+    aims to poll once a batch worth of articles has arrived, using an EWMA of the
+    arrival rate. While the backlog is at least `target_batch` (a poll would come
+    back full) it is halved towards `min_wait`, whatever the rate says; while
+    nothing arrives it is stretched by half again towards `max_wait`. Sampling
+    errors keep the previous interval.
+
+    Not wired to orion yet: its ArticleProcessor only sleeps a fixed wait_time.
+    """
+
+    def __init__(self, sample, min_wait, max_wait, target_batch, smoothing=0.3, log=print, clock=time.monotonic):
+        self.sample = sample
+        self.min_wait = min_wait
+        self.max_wait = max_wait
+        self.target_batch = target_batch
+        self.smoothing = smoothing
+        self.log = log
+        self.clock = clock
+        self.interval = max_wait
+        self.rate = None
+        self._last = None  # (monotonic time, inserted, backlog)
+        self._lock = threading.Lock()
+
+    def _clamp(self, seconds):
+        return max(self.min_wait, min(self.max_wait, seconds))
+
+    def next_interval(self):
+        try:
+            inserted, backlog = self.sample()
+        except Exception as e:
+            self.log(f"Adaptive wait sample failed, keeping {self.interval:.0f}s: {e}")
+            return self.interval
+        now = self.clock()
+        backlogged = backlog >= self.target_batch
+        with self._lock:
+            if self._last is None:
+                self._last = (now, inserted, backlog)
+                self.interval = self.min_wait if backlogged else self.interval
+                return self.interval
+            last_at, last_inserted, _ = self._last
+            self._last = (now, inserted, backlog)
+            elapsed = now - last_at
+            # the counter restarts with the stats collector; treat that sample as empty
+            arrived = max(0, inserted - last_inserted)
+            observed = arrived / elapsed if elapsed > 0 else 0.0
+            self.rate = observed if self.rate is None else self.smoothing * observed + (1 - self.smoothing) * self.rate
+
+            if backlogged:
+                interval = self.interval / 2
+                reason = f"backlogged ({backlog} >= {self.target_batch})"
+            elif arrived == 0:
+                interval = self.interval * 1.5
+                reason = "idle"
+            else:
+                interval = self.target_batch / self.rate if self.rate else self.max_wait
+                reason = f"{self.rate * 60:.1f} articles/min"
+            self.interval = self._clamp(interval)
+        self.log(f"Adaptive wait {self.interval:.0f}s: {reason}")
+        return self.interval
+
+    def sleep(self, event):
+        """Waits out the next interval on `event`; returns True if the event was set meanwhile"""
+        return event.wait(self.next_interval())
@@ -0,0 +1,109 @@
+import time
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+SHARD_UNITS = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+
+
+def split_range(start, end, unit):
+    """[(shard_start, shard_end)] covering [start, end), aligned to whole hours or days
+
+    The first and last shards are clipped to the range, so a rerun with the same
+    bounds produces the same shards.
+    """
+    step = SHARD_UNITS[unit]
+    aligned = start.replace(minute=0, second=0, microsecond=0)
+    if unit == 'day':
+        aligned = aligned.replace(hour=0)
+    shards = []
+    shard_start = start
+    boundary = aligned + step
+    while shard_start < end:
+        shard_end = min(boundary, end)
+        shards.append((shard_start, shard_end))
+        shard_start = shard_end
+        boundary += step
+    return shards
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+class BackfillRunner:
+    """Runs time shards concurrently, checkpointing each one as it finishes
+
+    `run_shard(start, end)` returns True when the shard is complete; a shard that
+    raises or returns False is left unrecorded so the next run retries it, and
+    shards not started before `should_continue()` turns false are left as remaining.
+    `checkpoint(start, end, seconds)` is called for every completed shard.
+    """
+
+    def __init__(self, run_shard, checkpoint, parallelism=4, should_continue=lambda: True, log=print):
+        self.run_shard = run_shard
+        self.checkpoint = checkpoint
+        self.parallelism = parallelism
+        self.should_continue = should_continue
+        self.log = log
+
+    def _run(self, shard):
+        if not self.should_continue():
+            return None
+        start = time.monotonic()
+        if not self.run_shard(*shard):
+            return False
+        self.checkpoint(*shard, time.monotonic() - start)
+        return True
+
+    def run(self, shards):
+        """Processes `shards` and returns {'completed', 'failed', 'remaining', 'seconds'}"""
+        run_start = time.monotonic()
+        completed, failed = 0, []
+        executor = ThreadPoolExecutor(max_workers=self.parallelism, thread_name_prefix="backfill")
+        try:
+            futures = {executor.submit(self._run, shard): shard for shard in shards}
+            pending = set(futures)
+            while pending:
+                if not self.should_continue():
+                    for future in pending:
+                        future.cancel()
+                done, pending = wait(pending, timeout=5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    shard = futures[future]
+                    if future.cancelled():
+                        continue
+                    try:
+                        ok = future.result()
+                    except Exception as e:
+                        ok = False
+                        self.log(f"Shard {shard[0]} - {shard[1]} failed: {e}")
+                    if ok is None:
+                        continue
+                    if ok:
+                        completed += 1
+                    else:
+                        failed.append(shard)
+                    self._progress(completed, len(failed), len(shards), run_start)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        return {
+            'completed': completed,
+            'failed': failed,
+            'remaining': len(shards) - completed - len(failed),
+            'seconds': time.monotonic() - run_start,
+        }
+
+    def _progress(self, completed, failed, total, run_start):
+        elapsed = time.monotonic() - run_start
+        finished = completed + failed
+        eta = elapsed / finished * (total - finished) if finished else None
+        self.log(
+            f"Backfill {finished}/{total} shards ({finished / total:.0%}), {failed} failed, "
+            f"elapsed {format_duration(elapsed)}, ETA {format_duration(eta) if eta is not None else 'unknown'}"
+        )
@@ -0,0 +1,188 @@
+import re
+import time
+import threading
+import psycopg2.extensions
+
+WRITE_VERBS = ('INSERT', 'UPDATE', 'DELETE')
+# a batch poll: a SELECT with a LIMIT; lookups that orion runs per article usually have neither
+POLL_PATTERN = r'^\s*SELECT\b.*\bLIMIT\b'
+
+
+def statement_verb(query):
+    if isinstance(query, bytes):
+        query = query[:64].decode(errors='ignore')
+    if not isinstance(query, str):
+        return None
+    words = query.lstrip().split(None, 1)
+    return words[0].upper() if words else None
+
+
+class StageStats:
+    """Rows a stage polls in and writes out, seen through its articles cursors
+
+    Only statements matching `poll_pattern` count as the stage's polls on its
+    input; other SELECTs (lookups, counts) are ignored. A stage's polls coming
+    back full (`last_intake` equal to its batch size) means its input is backing
+    up: that stage is the bottleneck.
+
+    A stage's input queue is estimated as the rows its `upstream` has polled in
+    minus the rows it has polled in itself. A poll that comes back short took
+    everything that was waiting, so it resets the estimate to zero. Rows the
+    upstream still holds count as queued, which errs towards pausing early.
+    """
+
+    def __init__(self, name, batch_size, poll_pattern=POLL_PATTERN, queue_limit=None):
+        self.name = name
+        self.batch_size = batch_size
+        self.poll_pattern = re.compile(poll_pattern, re.IGNORECASE | re.DOTALL) if isinstance(poll_pattern, str) else poll_pattern
+        self.queue_limit = queue_limit
+        self.upstream = None
+        self.downstream = None
+        self.running = False
+        self.polls = 0
+        self.rows_read = 0
+        self.rows_written = 0
+        self.last_intake = 0
+        self.paused_seconds = 0.0
+        self._drained_offset = 0
+        self._lock = threading.Lock()
+
+    def is_poll(self, query):
+        if isinstance(query, bytes):
+            query = query.decode(errors='ignore')
+        return isinstance(query, str) and statement_verb(query) == 'SELECT' and self.poll_pattern.search(query) is not None
+
+    def record(self, query, rowcount):
+        if rowcount is None or rowcount < 0:
+            return
+        verb = statement_verb(query)
+        if verb in WRITE_VERBS:
+            with self._lock:
+                self.rows_written += rowcount
+        elif self.is_poll(query):
+            upstream_read = self.upstream.rows_read if self.upstream is not None else 0
+            with self._lock:
+                self.polls += 1
+                self.rows_read += rowcount
+                self.last_intake = rowcount
+                if rowcount < self.batch_size:
+                    self._drained_offset = upstream_read - self.rows_read
+
+    def queued(self):
+        """Estimated rows waiting for this stage; 0 for the first stage"""
+        if self.upstream is None:
+            return 0
+        upstream_read = self.upstream.rows_read
+        with self._lock:
+            return max(0, upstream_read - self.rows_read - self._drained_offset)
+
+    def wait_for_room(self, should_continue, poll_seconds=1):
+        """Blocks this stage's next poll while its running downstream stage has more than `queue_limit` rows queued"""
+        downstream = self.downstream
+        if downstream is None or downstream.queue_limit is None:
+            return
+        start = time.monotonic()
+        while should_continue() and downstream.running and downstream.queued() > downstream.queue_limit:
+            time.sleep(poll_seconds)
+        with self._lock:
+            self.paused_seconds += time.monotonic() - start
+
+    def snapshot(self, elapsed):
+        queued = self.queued()
+        with self._lock:
+            return {
+                'polls': self.polls,
+                'rows_read': self.rows_read,
+                'rows_written': self.rows_written,
+                'written_per_min': self.rows_written / elapsed * 60 if elapsed else 0.0,
+                'occupancy': min(1.0, self.last_intake / self.batch_size) if self.batch_size else 0.0,
+                'queued': queued,
+                'paused_seconds': self.paused_seconds,
+            }
+
+
+def link_stages(stats):
+    """Chains StageStats in step order so each stage sees its upstream and downstream"""
+    for upstream, downstream in zip(stats, stats[1:]):
+        upstream.downstream = downstream
+        downstream.upstream = upstream
+
+
+def stage_cursor_factory(stats, should_continue=lambda: True):
+    """psycopg2 cursor class that reports every statement's rowcount to `stats` and holds polls back while the next stage is full"""
+    class StageCursor(psycopg2.extensions.cursor):
+        def execute(self, query, vars=None):
+            if stats.is_poll(query):
+                stats.wait_for_room(should_continue)
+            result = super().execute(query, vars)
+            stats.record(query, self.rowcount)
+            return result
+
+    return StageCursor
+
+
+class StagePipeline:
+    """Runs one worker group per step at the same time and reports each stage's throughput
+
+    Stages hand work to each other through the article rows' step status, so a
+    slow stage lets its input accumulate in the database while each stage holds
+    at most one batch in memory. Stages whose stats were linked with
+    `link_stages` and given a `queue_limit` pause their upstream instead.
+    `stages` is a list of (stats, run) pairs; `run()` blocks until its stage stops.
+
+    Polls are recognised by matching SQL text, not reported by the stage itself,
+    so a running stage with no poll recorded after the first report interval is
+    reported through `warn`: its counters, occupancy and queue limit are all
+    inert until its poll_pattern matches.
+    """
+
+    def __init__(self, stages, report_interval=60, log=print, warn=None):
+        self.stages = stages
+        self.report_interval = report_interval
+        self.log = log
+        self.warn = warn or log
+        self._warned = set()
+
+    def _run_stage(self, stats, run):
+        stats.running = True
+        try:
+            run()
+        except Exception as e:
+            self.log(f"Stage {stats.name} stopped with error: {e}")
+        finally:
+            stats.running = False
+
+    def run(self):
+        start = time.monotonic()
+        threads = [
+            threading.Thread(target=self._run_stage, args=stage, name=f"stage-{stage[0].name}", daemon=True)
+            for stage in self.stages
+        ]
+        for thread in threads:
+            thread.start()
+        next_report = start + self.report_interval
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=1)
+            if time.monotonic() >= next_report:
+                self.report(start, threads)
+                next_report += self.report_interval
+        self.report(start, threads)
+
+    def report(self, start, threads):
+        elapsed = time.monotonic() - start
+        for (stats, _), thread in zip(self.stages, threads):
+            snapshot = stats.snapshot(elapsed)
+            self.log(
+                f"Stage {stats.name}: {snapshot['rows_written']} rows written ({snapshot['written_per_min']:.1f}/min), "
+                f"{snapshot['rows_read']} read in {snapshot['polls']} polls, input occupancy {snapshot['occupancy']:.0%}, "
+                f"~{snapshot['queued']} queued, paused {snapshot['paused_seconds']:.0f}s"
+                f"{'' if thread.is_alive() else ', stopped'}"
+            )
+            if thread.is_alive() and not snapshot['polls'] and elapsed >= self.report_interval and stats.name not in self._warned:
+                self._warned.add(stats.name)
+                self.warn(
+                    f"Stage {stats.name} has recorded no polls in {elapsed:.0f}s; its poll pattern "
+                    f"{stats.poll_pattern.pattern!r} may not match its input query (--poll-pattern), "
+                    f"so its backpressure and occupancy are not measured"
+                )
@@ -0,0 +1,170 @@
+import time
+import heapq
+import random
+import threading
+import traceback
+from itertools import count
+
+
+class Job:
+    def __init__(self, name, func, interval, jitter=0, catch_up=True, run_at_start=True):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.catch_up = catch_up
+        self.run_at_start = run_at_start
+        self.running = False
+        self.rerun = False
+        self.thread = None
+        self.deadline = None
+        self.stats = {
+            'runs': 0,
+            'failures': 0,
+            'skipped_overlap': 0,
+            'missed': 0,
+            'last_duration': None,
+            'max_duration': 0.0,
+            'total_duration': 0.0,
+        }
+
+
+class Scheduler:
+    """Runs periodic jobs from one heap of deadlines
+
+    Deadlines advance by whole intervals from the previous deadline, so run time
+    does not make the schedule drift. A job never overlaps itself; a deadline that
+    passes while it runs is counted as missed and, with `catch_up`, run once as soon
+    as the current run ends. A job may return a number of seconds to override its
+    next delay (0 re-runs it immediately). `stop()` wakes the scheduler at once.
+    Callbacks registered with `on_run()` see every finished run's duration.
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._heap = []
+        self._seq = count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._listeners = []
+
+    def on_run(self, callback):
+        """Calls callback(name, duration, failed) after every run"""
+        self._listeners.append(callback)
+
+    def add(self, name, func, interval, jitter=0, catch_up=True, run_at_start=True):
+        job = Job(name, func, interval, jitter, catch_up, run_at_start)
+        with self._lock:
+            self._jobs[name] = job
+            delay = 0 if run_at_start else interval
+            self._schedule(job, time.monotonic() + delay)
+        return job
+
+    def _schedule(self, job, deadline):
+        job.deadline = deadline
+        heapq.heappush(self._heap, (deadline + random.uniform(0, job.jitter), next(self._seq), job.name, deadline))
+        self._wakeup.set()
+
+    def trigger(self, name):
+        """Runs `name` as soon as possible, or right after its current run"""
+        with self._lock:
+            job = self._jobs[name]
+            if job.running:
+                job.rerun = True
+            else:
+                self._schedule(job, time.monotonic())
+
+    def _next_deadline(self, job, previous, override):
+        now = time.monotonic()
+        if override is not None:
+            return now + override
+        deadline = previous + job.interval
+        if deadline > now:
+            return deadline
+        missed = int((now - deadline) // job.interval) + 1
+        job.stats['missed'] += missed
+        if job.catch_up:
+            return now
+        return deadline + missed * job.interval
+
+    def _run(self, job, deadline):
+        start = time.monotonic()
+        override = None
+        failed = False
+        try:
+            override = job.func()
+            if not isinstance(override, (int, float)) or isinstance(override, bool):
+                override = None
+        except Exception:
+            failed = True
+            job.stats['failures'] += 1
+            print(f"Scheduler: {job.name} failed\n{traceback.format_exc()}")
+        duration = time.monotonic() - start
+        for callback in self._listeners:
+            try:
+                callback(job.name, duration, failed)
+            except Exception as e:
+                print(f"Scheduler: {job.name} run callback failed: {e}")
+        with self._lock:
+            job.running = False
+            job.stats['runs'] += 1
+            job.stats['last_duration'] = duration
+            job.stats['max_duration'] = max(job.stats['max_duration'], duration)
+            job.stats['total_duration'] += duration
+            if job.rerun:
+                job.rerun = False
+                override = 0
+            if not self._stopped.is_set():
+                self._schedule(job, self._next_deadline(job, deadline, override))
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            with self._lock:
+                self._wakeup.clear()
+                timeout = None
+                while self._heap:
+                    due, _, name, deadline = self._heap[0]
+                    job = self._jobs[name]
+                    if deadline != job.deadline:
+                        heapq.heappop(self._heap)  # superseded by trigger() or a reschedule
+                        continue
+                    if due > time.monotonic():
+                        timeout = due - time.monotonic()
+                        break
+                    heapq.heappop(self._heap)
+                    if job.running:
+                        job.stats['skipped_overlap'] += 1
+                        job.rerun = job.rerun or job.catch_up
+                        continue
+                    job.running = True
+                    job.thread = threading.Thread(target=self._run, args=(job, deadline), name=job.name, daemon=True)
+                    job.thread.start()
+            self._wakeup.wait(timeout)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops scheduling new runs; runs in progress continue until join()"""
+        self._stopped.set()
+        self._wakeup.set()
+
+    def busy(self):
+        with self._lock:
+            return [job.name for job in self._jobs.values() if job.running]
+
+    def join(self, timeout):
+        """Waits up to `timeout` seconds for runs in progress; returns the names still running"""
+        deadline = time.monotonic() + timeout
+        for job in list(self._jobs.values()):
+            thread = job.thread
+            if thread is not None:
+                thread.join(max(0, deadline - time.monotonic()))
+        return self.busy()
+
+    def metrics(self):
+        with self._lock:
+            return {name: dict(job.stats, running=job.running) for name, job in self._jobs.items()}
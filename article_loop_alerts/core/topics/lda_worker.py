@@ -0,0 +1,54 @@
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+NEW_DATA_QUERY = """
+    SELECT category, COUNT(*)
+    FROM translated_articles
+    WHERE processed_at > %s
+    AND thread_status = 'processed'
+    GROUP BY category;
+"""
+
+
+def categories_with_new_data(cursor, since):
+    """{category: relevant articles processed after `since`}"""
+    cursor.execute(NEW_DATA_QUERY, (since,))
+    return dict(cursor.fetchall())
+
+
+def _refresh_topics(dsn):
+    """Runs in the child process: own interpreter, own GIL, own connection"""
+    import psycopg2
+    lda_funcs = importlib.import_module('lda_funcs')
+    with psycopg2.connect(dsn) as conn:
+        with conn.cursor() as cursor:
+            lda_funcs.check_and_process_lda(cursor)
+
+
+class LdaRunner:
+    """Runs lda_funcs.check_and_process_lda in a single spawned worker process
+
+    The fit is CPU-bound; keeping it out of the loop's interpreter means it never
+    holds the GIL the fetch and process threads need.
+    """
+
+    def __init__(self, dsn):
+        self.dsn = dsn
+        self._executor = self._new_executor()
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+
+    def refresh(self, timeout=None):
+        """Refits every category; blocks (without the GIL) until the worker finishes and re-raises its exceptions"""
+        try:
+            return self._executor.submit(_refresh_topics, self.dsn).result(timeout)
+        except BrokenProcessPool:
+            # the worker died (OOM, segfault); start a fresh one for the next run
+            self._executor = self._new_executor()
+            raise
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
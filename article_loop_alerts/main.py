@@ -1,4 +1,3 @@
-import os
 import orion
 import signal
 import logging
@@ -8,6 +7,13 @@ import threading
 from dotenv import load_dotenv
 from datetime import datetime, timedelta, timezone
 from core.alerts.alerts_logger import AlertLogger
+from core.db.watermarks import oldest_watermark
+from core.config.registry import get_registry
+from core.db.pool import get_pool, close_pools, PoolTimeout
+from core.db.cursors import ThreadCursors
+from core.db.checkpoints import ensure_checkpoint_table, completed_shards, mark_shard_complete
+from core.scheduling.backfill import BackfillRunner, split_range, SHARD_UNITS, format_duration
+from core.scheduling.pipeline import StagePipeline, StageStats, stage_cursor_factory, link_stages, POLL_PATTERN
 import warnings
 
 
@@ -33,12 +39,150 @@ logger = AlertLogger('orion-article-parser')
 
 shutdown_event = threading.Event()
 
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+PIPELINE_REPORT_INTERVAL = 60
+
 
 def signal_handler(sig, frame):
     """Handle termination signals."""
     logger.info(f"Received signal {sig}, initiating shutdown...")
     shutdown_event.set()
 
+def configured_codes():
+    """(category, code) pairs in gcam_config.json, or [] when it cannot be read"""
+    try:
+        data = get_registry().get()
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read the category config: {e}")
+        return []
+    return [(category, code) for category, entry in data.items() for code in entry.get('codes', [])]
+
+def resolve_start_time(cursor):
+    """Backdates from the configured code whose fetch has fallen furthest behind, within the processing window
+
+    Watermarks only advance in main_loop's fetch; a backdate does not move them.
+    Falls back to 1 day ago when no configured code has a watermark yet.
+    """
+    start = None
+    try:
+        start = oldest_watermark(cursor, configured_codes())
+    except psycopg2.Error as e:
+        cursor.connection.rollback()
+        logger.warning(f"Could not read fetch watermarks: {e}")
+    if start is None:
+        start = datetime.now(timezone.utc) - timedelta(1)
+    return start.strftime(TIME_FORMAT)
+
+def parse_time(value):
+    return datetime.strptime(value, TIME_FORMAT).replace(tzinfo=timezone.utc)
+
+def create_processor(args, steps, db_cursors, start_time, end_time, max_threads=None, batch_size=None):
+    return orion.ArticleProcessor(
+        steps=steps,
+        max_threads=max_threads or args.max_threads,
+        wait_time=args.wait,
+        batch_size=batch_size or args.batch_size,
+        cursors=db_cursors,
+        logger=logger,
+        shutdown_event=shutdown_event,
+        extra_args={
+            'back_date': args.back_date,
+            'start_time': start_time,
+            'end_time': end_time
+        }
+    )
+
+def run_sharded_back_date(args, steps, db_cursors):
+    """Backdates [start, end) in hourly or daily shards, skipping shards a previous run already finished"""
+    run_key = ','.join(steps)
+    start, end = parse_time(args.start_time), parse_time(args.end_time)
+    with db_cursors.cursor('articles') as cursor:
+        ensure_checkpoint_table(cursor)
+        done = completed_shards(cursor, run_key, start, end)
+
+    shards = [shard for shard in split_range(start, end, args.shard) if shard not in done]
+    # progress goes to the plain log; AlertLogger.info would post every line to Slack
+    logger.logger.info(
+        f"Backdating {start} - {end} for {run_key}: {len(shards)} {args.shard} shards to run, "
+        f"{len(done)} already done, {args.shard_parallelism} at a time"
+    )
+    if not shards:
+        return
+
+    def run_shard(shard_start, shard_end):
+        processor = create_processor(args, steps, db_cursors, shard_start.strftime(TIME_FORMAT), shard_end.strftime(TIME_FORMAT))
+        processor.start()
+        db_cursors.release()
+        # a shard cut short by shutdown is not complete
+        return not shutdown_event.is_set()
+
+    def checkpoint(shard_start, shard_end, seconds):
+        with db_cursors.cursor('articles') as cursor:
+            mark_shard_complete(cursor, run_key, shard_start, shard_end, seconds)
+
+    runner = BackfillRunner(
+        run_shard,
+        checkpoint,
+        parallelism=args.shard_parallelism,
+        should_continue=lambda: not shutdown_event.is_set(),
+        log=logger.logger.info
+    )
+    result = runner.run(shards)
+    logger.info(
+        f"Backdate finished in {format_duration(result['seconds'])}: {result['completed']} shards completed, "
+        f"{len(result['failed'])} failed, {result['remaining']} not started; rerun to resume"
+    )
+
+def parse_stage_settings(value, steps, default):
+    """'content=8,translate=4' -> {step: int}; steps not listed get `default`"""
+    settings = {step: default for step in steps}
+    for item in filter(None, (value or '').split(',')):
+        step, _, number = item.partition('=')
+        if step not in settings:
+            raise ValueError(f"unknown step {step!r} in {value!r}")
+        settings[step] = int(number)
+    return settings
+
+def run_pipeline(args, steps, pools):
+    """Runs every step as its own worker group at the same time, so download and translation overlap
+
+    A stage's polls wait while the next stage has more than --stage-queue-limit
+    rows queued (default: two polls' worth for each of the next stage's threads).
+    """
+    stage_threads = parse_stage_settings(args.stage_threads, steps, args.max_threads)
+    stage_batches = parse_stage_settings(args.stage_batch_size, steps, args.batch_size)
+    stats = [
+        StageStats(
+            step, stage_batches[step], poll_pattern=args.poll_pattern,
+            queue_limit=args.stage_queue_limit or 2 * stage_threads[step] * stage_batches[step]
+        )
+        for step in steps
+    ]
+    link_stages(stats)
+    stages = []
+    stage_cursors = []
+    for step, step_stats in zip(steps, stats):
+        # only the articles pool carries the stage's input polls
+        factory = stage_cursor_factory(step_stats, should_continue=lambda: not shutdown_event.is_set())
+        cursors = ThreadCursors(pools, cursor_factories={'articles': factory})
+        processor = create_processor(
+            args, [step], cursors, args.start_time, args.end_time,
+            max_threads=stage_threads[step], batch_size=stage_batches[step]
+        )
+        stages.append((step_stats, processor.start))
+        stage_cursors.append(cursors)
+        logger.logger.info(
+            f"Stage {step}: {stage_threads[step]} threads, batches of {stage_batches[step]}"
+            + (f", upstream paused above {step_stats.queue_limit} queued rows" if step_stats.upstream else '')
+        )
+    try:
+        StagePipeline(
+            stages, report_interval=PIPELINE_REPORT_INTERVAL, log=logger.logger.info, warn=logger.logger.warning
+        ).run()
+    finally:
+        for cursors in stage_cursors:
+            cursors.close()
+
 def parse_args():
     """Parse command-line arguments."""
     parser = argparse.ArgumentParser(description='Process articles through a chain of steps.')
@@ -81,8 +225,8 @@ def parse_args():
     parser.add_argument(
         '--start-time',
         type = str,
-        default = (datetime.now(timezone.utc)-timedelta(1)).strftime("%Y-%m-%d %H:%M:%S"),
-        help = 'Argument used to identify start_date for backdating'
+        default = None,
+        help = 'Argument used to identify start_date for backdating (default: oldest fetch watermark of the configured codes, at most 2 days back, else 1 day ago)'
     )
     
     parser.add_argument(
@@ -92,6 +236,56 @@ def parse_args():
         help = 'Argument used to identify end_date for backdating'
     )
 
+    parser.add_argument(
+        '--pipeline',
+        action='store_true',
+        help='Run each of --steps as its own worker group at the same time instead of one after another per batch'
+    )
+
+    parser.add_argument(
+        '--stage-threads',
+        type=str,
+        default=None,
+        help='Per-step worker threads with --pipeline, e.g. content=8,translate=4 (default: --max-threads)'
+    )
+
+    parser.add_argument(
+        '--stage-batch-size',
+        type=str,
+        default=None,
+        help='Per-step batch size with --pipeline, e.g. content=100,translate=25 (default: --batch-size)'
+    )
+
+    parser.add_argument(
+        '--stage-queue-limit',
+        type=int,
+        default=None,
+        help='With --pipeline, pause a stage while the next one has more than this many rows queued '
+             '(default: twice the next stage\'s threads x batch size)'
+    )
+
+    parser.add_argument(
+        '--poll-pattern',
+        type=str,
+        default=POLL_PATTERN,
+        help='Regex matching the SELECT each step polls its input with; '
+             'these polls measure intake and queues for --pipeline'
+    )
+
+    parser.add_argument(
+        '--shard',
+        choices=['none', *SHARD_UNITS],
+        default='day',
+        help='Split --back-date ranges into checkpointed hourly or daily shards (none runs the range as one unit)'
+    )
+
+    parser.add_argument(
+        '--shard-parallelism',
+        type=int,
+        default=4,
+        help='Backdate shards processed concurrently, each with up to --max-threads workers'
+    )
+
     return parser.parse_args()
 @logger.log_execution()
 def main():
@@ -107,36 +301,46 @@ def main():
     steps = args.steps.split(',')
     
 
-    with psycopg2.connect(os.environ['CONN_STRING_ARTICLES']) as article_conn:
-        with psycopg2.connect(os.environ['CONN_STRING_BACKEND']) as backend_conn:
-            db_cursors = {
-                'articles': article_conn.cursor(),
-                'backend': backend_conn.cursor()
-            }
-            
-            if db_cursors['articles'] and db_cursors['backend']:
-                
-                # Create and start processor
-                processor = orion.ArticleProcessor(
-                    steps=steps,
-                    max_threads=args.max_threads,
-                    wait_time=args.wait,
-                    batch_size=args.batch_size,
-                    cursors=db_cursors,
-                    logger=logger,
-                    shutdown_event=shutdown_event,
-                    extra_args={
-                        'back_date': args.back_date,
-                        'start_time': args.start_time,
-                        'end_time': args.end_time
-                    }
-                )
-
-                processor.start()
-            
-            else:
-                print('Could not connect to articles or backend DBs. Make sure environment variables are initiaized.')
-                exit()
+    sharded = args.back_date and args.shard != 'none' and not args.pipeline
+    # one connection per worker thread plus the main thread and a spare
+    pool_size = args.max_threads * (args.shard_parallelism if sharded else 1) + 2
+    if sharded:
+        pool_size += args.shard_parallelism  # shard threads run the processors
+    if args.pipeline:
+        try:
+            stage_threads = parse_stage_settings(args.stage_threads, steps, args.max_threads)
+            parse_stage_settings(args.stage_batch_size, steps, args.batch_size)
+        except ValueError as e:
+            print(f"Invalid stage settings: {e}")
+            exit()
+        pool_size = sum(stage_threads.values()) + 2 * len(steps) + 2
+    try:
+        pools = {
+            'articles': get_pool('CONN_STRING_ARTICLES', maxconn=pool_size),
+            'backend': get_pool('CONN_STRING_BACKEND', maxconn=pool_size)
+        }
+        db_cursors = ThreadCursors(pools)
+    except (psycopg2.Error, KeyError) as e:
+        print(f'Could not connect to articles or backend DBs. Make sure environment variables are initiaized. ({e})')
+        exit()
+
+    try:
+        if args.start_time is None:
+            args.start_time = resolve_start_time(db_cursors['articles'])
+
+        if args.pipeline:
+            run_pipeline(args, steps, pools)
+        elif sharded:
+            run_sharded_back_date(args, steps, db_cursors)
+        else:
+            # Create and start processor
+            processor = create_processor(args, steps, db_cursors, args.start_time, args.end_time)
+            processor.start()
+    except PoolTimeout as e:
+        logger.error(f"No database connection available: {e}")
+    finally:
+        db_cursors.close()
+        close_pools()
 
 
 if __name__ == "__main__":
@@ -3,268 +3,478 @@ import psycopg2
 from psycopg2.extras import execute_values
 from psycopg2.errors import InvalidTextRepresentation
 from pull_article import *
-import json
 from alive_progress import alive_bar
 from lda_funcs import *
 import threading
 from datetime import datetime, timedelta, timezone
 import os
-from concurrent.futures import ThreadPoolExecutor
 import queue
 import sys
 import signal
-from tempfile import gettempdir
+import argparse
 import os.path
 from core.alerts.alerts_logger import AlertLogger
+from core.db.claims import (
+    claim_pending_articles, ensure_claim_schema, write_outcomes, reclaim_expired, release_claims, release_owner, owner_id,
+    failure_report, pending_depth, STATUS_PROCESSED, STATUS_IRRELEVANT, STATUS_FAILED
+)
+from core.db.pool import get_pool, close_pools, PoolTimeout
+from core.db.notify import notify_pending, PendingListener
+from core.db.leader import LeaderLock
+from core.db.leases import LeaseHeartbeat
+from core.db.watermarks import ensure_watermark_table, load_watermarks, advance_watermarks, fetch_window, MAX_LOOKBACK
+from core.fetch.rate_limit import get_bucket
+from core.fetch.concurrent_fetcher import ConcurrentFetcher
+from core.fetch.dedupe import SeenUrls
+from core.config.registry import get_registry
+from core.processing.dispatcher import CategoryDispatcher, group_by_category
+from core.processing.controller import AdaptiveController
+from core.processing.result_cache import ResultCache, CachePlan, ensure_result_cache_table
+from core.processing.near_duplicates import cluster_by_key
+from core.scheduling.scheduler import Scheduler
+from core.topics.lda_worker import LdaRunner, categories_with_new_data
+from core.metrics.server import start_metrics_server
+from core.metrics.loop import (
+    CLAIM_SECONDS, CLAIMED, track_chunk, track_llm, record_fetch, record_controller, watch_pools, watch_pending_depth,
+    watch_scheduler,
+)
 
-FETCH_LOCK_FILE = os.path.join(gettempdir(), "fetch_lock")
-PROCESS_LOCK_FILE = os.path.join(gettempdir(), "process_lock")
-PROCESS_INTERVAL = 3600  #1hr
+LEADER_RETRY_INTERVAL = 60  # followers retry leader election this often
+PROCESS_INTERVAL = 3600  #1hr, fallback when no notification arrives
+PROCESS_DEBOUNCE = 10
 FETCH_INTERVAL = 14400  # 4 hours
+LDA_INTERVAL = 86400  # daily; skipped when nothing new was processed
+FETCH_UPSTREAM = 'gdelt'
+FETCH_RATE = 0.5  # fetch_articles_past calls per second
+FETCH_BURST = 4
+FETCH_PARALLELISM = 8
+FETCH_DEFAULT_LOOKBACK = timedelta(hours=4)  # codes without a watermark
+FETCH_MAX_LOOKBACK = MAX_LOOKBACK  # matches the processing window
+# max_connections is server-wide: the default 100 minus 3 superuser slots fits two replicas at 48
+CONNECTION_BUDGET = 48
+NON_POOL_CONNECTIONS = 4  # fetch and LDA LeaderLock sessions, the LISTEN connection, the LDA child
+LOOP_CONNECTIONS = FETCH_PARALLELISM + 5  # fetchers + loops
+BATCH_SIZE = 100
+MAX_BATCH_SIZE = 250
+SEEN_URLS_SIZE = 500000
+RESULT_CACHE_TTL = 7 * 86400
+RESULT_CACHE_SIZE = 1000000
+RESULT_CACHE_EVICT_INTERVAL = 3600
+MISSING_RESULT_REASON = 'not returned by extract_translate'
+METRICS_PORT = 9108
+DRAIN_TIMEOUT = 300  # longer than one chunk at the controller's target_chunk_seconds
 logger = AlertLogger('article-loop-main')
 running = True
+OWNER_ID = owner_id()
+
+def workers_for_budget(budget):
+    """Chunk workers that fit in `budget` connections per server next to the loops and the non-pool sessions"""
+    return max(1, budget - NON_POOL_CONNECTIONS - LOOP_CONNECTIONS)
+
+MAX_WORKERS = workers_for_budget(CONNECTION_BUDGET)
+ARTICLES_POOL_SIZE = MAX_WORKERS + LOOP_CONNECTIONS
+BACKEND_POOL_SIZE = MAX_WORKERS  # extract_translate holds a backend cursor per chunk
+# starts at half the ceiling and grows while a backlog remains
+CONTROLLER = AdaptiveController(max(1, MAX_WORKERS // 2), BATCH_SIZE, max_workers=MAX_WORKERS, max_batch=MAX_BATCH_SIZE)
+RESULT_CACHE = ResultCache(ttl=RESULT_CACHE_TTL, max_entries=RESULT_CACHE_SIZE)
+
+def articles_pool():
+    return get_pool('CONN_STRING_ARTICLES', maxconn=ARTICLES_POOL_SIZE)
+
+def backend_pool():
+    return get_pool('CONN_STRING_BACKEND', maxconn=BACKEND_POOL_SIZE)
+
+def size_pools(workers):
+    """Sizes the shared pools and the controller's ceiling for `workers` concurrent chunks; must run before the first checkout"""
+    global ARTICLES_POOL_SIZE, BACKEND_POOL_SIZE
+    ARTICLES_POOL_SIZE = workers + LOOP_CONNECTIONS
+    BACKEND_POOL_SIZE = workers
+    CONTROLLER.max_workers = workers
+    CONTROLLER.workers = max(1, workers // 2)
 
 def signal_handler(signum, frame):
-    """Handle shutdown"""
+    """Handle shutdown; a second signal skips the drain"""
     global running
-    print("\nSHUTDOWN")
+    if not running:
+        print("\nSHUTDOWN forced, skipping drain")
+        os._exit(1)
+    print("\nSHUTDOWN, draining")
     running = False
 
+def chunk_statuses(articles_chunk, processed_articles):
+    """Maps every url in the chunk to its terminal status after extract_translate"""
+    judged = {}
+    if not processed_articles.empty:
+        judged = dict(zip(processed_articles['url'], processed_articles['relevance'] == True))
+    statuses = {}
+    for article in articles_chunk:
+        url = article[0]
+        if url not in judged:
+            statuses[url] = STATUS_FAILED
+        elif judged[url]:
+            statuses[url] = STATUS_PROCESSED
+        else:
+            statuses[url] = STATUS_IRRELEVANT
+    return statuses
+
+def plan_chunk(articles_chunk, prompt):
+    """Splits a chunk against the result cache; if the cache is unreachable every article goes to the LLM"""
+    try:
+        with articles_pool().cursor() as cache_cursor:
+            return RESULT_CACHE.plan(cache_cursor, articles_chunk, prompt)
+    except (psycopg2.Error, PoolTimeout) as e:
+        print(f"Result cache lookup failed: {e}")
+    plan = CachePlan({}, [])
+    plan.pending = list(articles_chunk)
+    return plan
+
+def store_chunk_results(plan, processed_articles):
+    try:
+        with articles_pool().cursor() as cache_cursor:
+            RESULT_CACHE.store(cache_cursor, plan, processed_articles)
+    except (psycopg2.Error, PoolTimeout) as e:
+        print(f"Result cache store failed: {e}")
+
+def extract_chunk(articles_chunk, prompt):
+    """Runs extract_translate on the uncached articles of a category-homogeneous chunk; returns (processed_articles, statuses)"""
+    category = articles_chunk[0][4]
+    plan = plan_chunk(articles_chunk, prompt)
+    processed_articles = pd.DataFrame(columns=['url'])
+
+    if plan.pending:
+        articles_df = pd.DataFrame(plan.pending, columns=['url', 'title', 'language', 'sourcecountry', 'category', 'code'])
+        with CONTROLLER.track(len(plan.pending)), backend_pool().cursor() as countries_cursor, track_llm(category):
+            processed_articles = extract_translate(
+                category, 
+                prompt, 
+                articles_df, 
+                countries_cursor
+            )
+        store_chunk_results(plan, processed_articles)
+
+    processed_articles = plan.combine(processed_articles)
+    return processed_articles, chunk_statuses(articles_chunk, processed_articles)
+
+def cluster_claimed(articles, prompt_for):
+    """Orders a claimed batch as leaders first, then near-duplicates that can reuse their cached results"""
+    leaders, followers = cluster_by_key(
+        articles, lambda article: RESULT_CACHE.key(article, prompt_for(article[4]))
+    )
+    if followers:
+        print(f"Near-duplicates - {len(followers)} of {len(articles)} articles deferred behind {len(leaders)} leaders")
+    return [phase for phase in (leaders, followers) if phase]
+
 def process_article_batch(articles_chunk, prompt, thread_id):
     """Processes articles in a thread"""
     thread_name = f"Worker-{thread_id}"
     threading.current_thread().name = thread_name
     
-    with psycopg2.connect(os.environ['CONN_STRING_ARTICLES']) as thread_cursor_conn:
-        with thread_cursor_conn.cursor() as thread_cursor:
-            with psycopg2.connect(os.environ['CONN_STRING_BACKEND']) as countries_conn:
-                with countries_conn.cursor() as countries_cursor:
-                    try:
-                        print(f"{thread_name}: processing {len(articles_chunk)} articles")
-                        articles_df = pd.DataFrame(articles_chunk, columns=['url', 'title', 'language', 'sourcecountry', 'category', 'code'])
-                        
-                        processed_articles = extract_translate(
-                            articles_df['category'].iloc[0], 
-                            prompt, 
-                            articles_df, 
-                            countries_cursor
-                        )
-                        
-                        if not processed_articles.empty:
-                            successful_urls = processed_articles[processed_articles['relevance'] == True]['url'].tolist()
-                            if successful_urls:
-                                insert_relevant_articles(processed_articles, thread_cursor)
-                                placeholders = ','.join(['%s'] * len(successful_urls))
-                                update_query = f"""
-                                    UPDATE translated_articles 
-                                    SET thread_status = 'processed' 
-                                    WHERE url IN ({placeholders})
-                                    AND thread_status = 'processing';
-                                """
-                                thread_cursor.execute(update_query, successful_urls)
-                                thread_cursor_conn.commit()
-                                print(f"{thread_name}: completed {len(successful_urls)} articles")
-                    except Exception as e:
-                        print(f"{thread_name}: error - {e}")
+    with track_chunk(articles_chunk[0][4]):
+        try:
+            print(f"{thread_name}: processing {len(articles_chunk)} articles")
+            processed_articles, statuses = extract_chunk(articles_chunk, prompt)
+            relevant_count = sum(1 for status in statuses.values() if status == STATUS_PROCESSED)
+            with articles_pool().cursor() as thread_cursor:
+                if relevant_count:
+                    insert_relevant_articles(processed_articles, thread_cursor)
+                write_outcomes(thread_cursor, OWNER_ID, statuses, MISSING_RESULT_REASON)
+            print(f"{thread_name}: completed {len(statuses)} articles, {relevant_count} relevant")
+        except Exception as e:
+            print(f"{thread_name}: error - {e}")
+            try:
+                with articles_pool().cursor() as thread_cursor:
+                    write_outcomes(
+                        thread_cursor, OWNER_ID,
+                        {article[0]: STATUS_FAILED for article in articles_chunk},
+                        f"{type(e).__name__}: {e}"
+                    )
+            except Exception as write_error:
+                print(f"{thread_name}: could not record chunk failure - {write_error}")
+
 @logger.log_execution()
-def process_pending_articles(cursor, num_threads=45, max_articles_per_thread=100):
-    """Processes pending articles in parallel threads"""
+def process_pending_articles(cursor, num_threads=None, max_articles_per_thread=None):
+    """Processes pending articles in parallel threads; returns True when a backlog remains"""
     
     if not running:
-        return  
-
-    count_query = """
-    SELECT COUNT(*) 
-    FROM translated_articles 
-    WHERE thread_status = 'pending'
-    AND utc_datetime >= NOW() - INTERVAL '2 days';
-    """
-    cursor.execute(count_query)
-    total_pending = cursor.fetchone()[0]
-
-    if total_pending == 0 or not running:
-        print("No recent pending articles")
-        return
+        return False
+    num_threads = num_threads or CONTROLLER.workers
+    max_articles_per_thread = max_articles_per_thread or CONTROLLER.batch_size
+    claim_limit = num_threads * max_articles_per_thread
+
+    reclaimed = reclaim_expired(cursor)
+    cursor.connection.commit()
+    if reclaimed:
+        print(f"Reclaimed {reclaimed} articles with expired leases")
 
-    batch_size = min(max(1, total_pending // num_threads), max_articles_per_thread)
-    adjusted_threads = min(num_threads, total_pending)
-
-    fetch_query = """
-    SELECT url, title, language, sourcecountry, category, code 
-    FROM translated_articles 
-    WHERE thread_status = 'pending'
-    AND utc_datetime >= NOW() - INTERVAL '2 days'
-    ORDER BY RANDOM()
-    LIMIT %s
-    FOR UPDATE SKIP LOCKED;
-    """
-    cursor.execute(fetch_query, (batch_size * adjusted_threads,))
-    articles = cursor.fetchall()
+    with CLAIM_SECONDS.time():
+        articles = claim_pending_articles(cursor, OWNER_ID, claim_limit)
+    CLAIMED.inc(len(articles))
 
     if not articles or not running:
-        return
+        print("No recent pending articles")
+        return False
 
-    urls = [article[0] for article in articles]
-    update_query = """
-    UPDATE translated_articles 
-    SET thread_status = 'processing' 
-    WHERE url = ANY(%s);
-    """
-    cursor.execute(update_query, (urls,))
-    cursor.connection.commit()
+    adjusted_threads = min(num_threads, len(articles))
+    batch_size = min(max(1, -(-len(articles) // adjusted_threads)), max_articles_per_thread)
 
-    article_chunks = [articles[i:i + batch_size] for i in range(0, len(articles), batch_size)]
-    
-    with ThreadPoolExecutor(max_workers=adjusted_threads) as executor:
-        futures = []
-        for i, chunk in enumerate(article_chunks):
-            if not running:  
-                break
-            # Get the category of the first article in the chunk to determine the prompt
-            if chunk:
-                category = chunk[0][4]  # Category is at index 4 in the article tuple
-                with open('gcam_config.json') as file:
-                    data = json.load(file)
-                if category in data:
-                    prompt = data[category]['prompt']
-                else:
-                    prompt = "Extract and summarize the key facts and information from this article."
-                
-                futures.append(executor.submit(process_article_batch, chunk, prompt, i))
-        
-        executor.shutdown(wait=True, cancel_futures=True)
-
-    reset_query = """
-        UPDATE translated_articles 
-        SET thread_status = 'pending' 
-        WHERE thread_status = 'processing'
-        AND utc_datetime >= NOW() - INTERVAL '2 days';
-    """
-    cursor.execute(reset_query)
+    config = get_registry()
+    dispatcher = CategoryDispatcher(
+        process_article_batch,
+        adjusted_threads,
+        limits=config.worker_limits(),
+        should_continue=lambda: running
+    )
+    with LeaseHeartbeat(OWNER_ID, articles_pool().cursor):
+        for phase in cluster_claimed(articles, config.prompt):
+            if running:
+                dispatcher.run(group_by_category(phase, batch_size), config.prompt)
+
+    release_claims(cursor, OWNER_ID, [article[0] for article in articles])
     cursor.connection.commit()
 
+    print(f"Controller: {CONTROLLER.update(len(articles), claim_limit)}")
+    record_controller(CONTROLLER)
+    return len(articles) >= claim_limit
+
+def warm_seen_urls():
+    """Builds the url dedupe filter from recent translated_articles rows"""
+    seen_urls = SeenUrls(max_size=SEEN_URLS_SIZE)
+    try:
+        with articles_pool().connection() as conn:
+            print(f"Warmed url dedupe filter with {seen_urls.warm(conn)} urls")
+    except (psycopg2.Error, PoolTimeout) as e:
+        print(f"Could not warm url dedupe filter: {e}")
+    return seen_urls
+
 @logger.log_execution()
-def fetch_articles_loop(data, max_requests=35):
-    """Fetches new articles"""
-    while running:
-        if os.path.exists(FETCH_LOCK_FILE):
-            print("Fetch already running")
-        else:
-            try:
-                open(FETCH_LOCK_FILE, "w").close()
-                with psycopg2.connect(os.environ['CONN_STRING_ARTICLES']) as conn:
-                    with conn.cursor() as cursor:
-                        current_time = datetime.now(timezone.utc)
-                        utc_datetime = current_time.strftime('%Y-%m-%d %H:%M:%S')
-                        past_time = (current_time - timedelta(hours=4)).strftime('%Y-%m-%d %H:%M:%S')
-
-                        total_inserted = 0
-                        for category in data:
-                            if not running: 
-                                break
-                            category_articles = []
-                            for code in data[category]['codes']:
-                                if not running: 
-                                    break
-                                fetched_articles = fetch_articles_past(
-                                    category, code, max_requests, data[category]['prompt'], 
-                                    past_time, utc_datetime, cursor
-                                )
-                                if not fetched_articles.empty:
-                                    category_articles.append(fetched_articles)
-                                time.sleep(5)
-                            
-                            if category_articles:
-                                category_df = pd.concat(category_articles, ignore_index=True)
-                                insert_query = """
-                                    INSERT INTO translated_articles 
-                                    (url, title, language, sourcecountry, category, code, utc_datetime, thread_status)
-                                    VALUES %s ON CONFLICT DO NOTHING;
-                                """
-                                execute_values(cursor, insert_query, category_df.to_records(index=False))
-                                conn.commit()
-                                total_inserted += len(category_df)
-                                print(f"Inserted {len(category_df)} - {category}")
-
-                        print(f"Fetch complete - {total_inserted} articles")
-            except psycopg2.Error as e:
-                print(f"Database error in fetch: {e}")
-            finally:
-                if os.path.exists(FETCH_LOCK_FILE):
-                    os.remove(FETCH_LOCK_FILE)
-        
-        for _ in range(FETCH_INTERVAL):
-            if not running:
-                return
-            time.sleep(1)
-@logger.log_execution()
-def process_articles_loop():
-    """Processes pending articles"""
-def process_articles_loop():
-    """Processes pending articles"""
-    while running:
-        if os.path.exists(PROCESS_LOCK_FILE):
-            print("Process already running")
-        else:
-            try:
-                open(PROCESS_LOCK_FILE, "w").close()
-                with psycopg2.connect(os.environ['CONN_STRING_ARTICLES']) as conn:
-                    with conn.cursor() as cursor:
-                        process_pending_articles(cursor)
-            except psycopg2.Error as e:
-                print(f"Database error in processing: {e}")
-            finally:
-                if os.path.exists(PROCESS_LOCK_FILE):
-                    os.remove(PROCESS_LOCK_FILE)
-        
-        for _ in range(PROCESS_INTERVAL):
-            if not running:
-                return
-            time.sleep(1)
+def fetch_articles(config, leader, seen_urls, max_requests=35):
+    """Fetches new articles; followers ask to be retried sooner in case the leader dies"""
+    if not leader.acquire():
+        print("Fetch running on another replica")
+        return LEADER_RETRY_INTERVAL
+    try:
+        with articles_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                current_time = datetime.now(timezone.utc)
+                utc_datetime = current_time.strftime('%Y-%m-%d %H:%M:%S')
+                watermarks = load_watermarks(cursor)
 
-def cleanup_stale_locks():
-    print('remove locks')
-    """Removes stale lock files and resets processing articles at startup"""
-    if os.path.exists(FETCH_LOCK_FILE):
-        os.remove(FETCH_LOCK_FILE)
-        print("Removed stale fetch lock")
-    if os.path.exists(PROCESS_LOCK_FILE):
-        os.remove(PROCESS_LOCK_FILE)
-        print("Removed stale process lock")
+                data = config.get()
+                inserted = {}
+                duplicates = {}
+                seen_urls.reset_stats()
 
+                def fetch_code(category, code):
+                    start, _ = fetch_window(
+                        watermarks.get((category, code)), current_time,
+                        FETCH_DEFAULT_LOOKBACK, FETCH_MAX_LOOKBACK
+                    )
+                    with articles_pool().cursor() as fetch_cursor:
+                        return fetch_articles_past(
+                            category, code, max_requests, data[category]['prompt'], 
+                            start.strftime('%Y-%m-%d %H:%M:%S'), utc_datetime, fetch_cursor
+                        )
+
+                def insert_category(category, category_articles, fetched_codes):
+                    category_df = pd.DataFrame(columns=['url'])
+                    if category_articles:
+                        fetched_df = pd.concat(category_articles, ignore_index=True)
+                        category_df = seen_urls.filter(fetched_df)
+                        duplicates[category] = len(fetched_df) - len(category_df)
+                    if not category_df.empty:
+                        insert_query = """
+                            INSERT INTO translated_articles 
+                            (url, title, language, sourcecountry, category, code, utc_datetime, thread_status)
+                            VALUES %s ON CONFLICT DO NOTHING;
+                        """
+                        execute_values(cursor, insert_query, category_df.to_records(index=False))
+                        notify_pending(cursor, category)
+                        inserted[category] = len(category_df)
+                        print(f"Inserted {len(category_df)} - {category} ({duplicates[category]} duplicates dropped)")
+                    advance_watermarks(cursor, category, fetched_codes, current_time)
+                    conn.commit()
+                    seen_urls.remember(category_df['url'])
+
+                fetcher = ConcurrentFetcher(
+                    fetch_code,
+                    get_bucket(FETCH_UPSTREAM, FETCH_RATE, FETCH_BURST),
+                    parallelism=FETCH_PARALLELISM,
+                    should_continue=lambda: running
+                )
+                stats = fetcher.run(
+                    {category: data[category]['codes'] for category in data},
+                    insert_category
+                )
+                record_fetch(inserted)
+                total_inserted = sum(inserted.values())
+                print(f"Fetched {stats['requests']} codes in {stats['seconds']:.1f}s, {stats['errors']} errors")
+                print(f"Fetch complete - {total_inserted} articles")
+                print(f"Dedupe - {sum(duplicates.values())} duplicates dropped, hit rate {seen_urls.hit_rate():.1%}, {len(seen_urls)} urls tracked")
+    except (psycopg2.Error, PoolTimeout) as e:
+        print(f"Database error in fetch: {e}")
+
+def process_articles():
+    """Processes pending articles; asks for an immediate re-run while a backlog remains"""
+    backlog = False
     try:
-        with psycopg2.connect(os.environ['CONN_STRING_ARTICLES']) as conn:
+        with articles_pool().cursor() as cursor:
+            backlog = process_pending_articles(cursor)
+    except (psycopg2.Error, PoolTimeout) as e:
+        print(f"Database error in processing: {e}")
+    if RESULT_CACHE.lookups:
+        print(f"Result cache - hit rate {RESULT_CACHE.hit_rate():.1%} over {RESULT_CACHE.lookups} articles")
+        RESULT_CACHE.reset_stats()
+    return 0 if backlog else None
+
+def listen_for_articles(listener, scheduler):
+    """Triggers the process job whenever the fetch path announces new articles"""
+    listener.listen()
+    while running:
+        announced = listener.wait(PROCESS_INTERVAL, lambda: running)
+        if announced is not None and running:
+            print(f"Woken by new articles: {', '.join(sorted(announced)) or 'unspecified'}")
+            scheduler.trigger('process')
+    listener.close()
+
+def reclaim_expired_articles():
+    """Returns articles whose claim lease expired (owner crashed or stalled) to pending at startup"""
+    try:
+        with articles_pool().connection() as conn:
             with conn.cursor() as cursor:
-                print("Resetting stuck articles")
-                cursor.execute("""
-                UPDATE translated_articles 
-                SET thread_status = 'pending' 
-                WHERE thread_status = 'processing'
-                AND utc_datetime >= NOW() - INTERVAL '2 days';
-            """)
-                reset_count = cursor.rowcount
+                reclaimed = reclaim_expired(cursor)
                 conn.commit()
-                print(f"Reset {reset_count} stuck articles from 'processing' to 'pending'")
-    except psycopg2.Error as e:
-        print(f"Database error while resetting articles: {e}")
+                print(f"Reclaimed {reclaimed} articles with expired leases")
+    except (psycopg2.Error, PoolTimeout) as e:
+        print(f"Database error while reclaiming articles: {e}")
+
+def evict_result_cache():
+    """Trims the LLM result cache to its TTL and size"""
+    try:
+        with articles_pool().cursor() as cursor:
+            evicted = RESULT_CACHE.evict(cursor)
+        if evicted:
+            print(f"Evicted {evicted} cached LLM results")
+    except (psycopg2.Error, PoolTimeout) as e:
+        print(f"Database error while evicting cached results: {e}")
+
 @logger.log_execution()
-def run_daily_lda():
-    """Runs LDA processing once per day"""
-def run_daily_lda():
-    """Runs LDA processing once per day"""
-    while running:
-        try:
-            with psycopg2.connect(os.environ['CONN_STRING_ARTICLES']) as conn:
-                with conn.cursor() as cursor:
-                    check_and_process_lda(cursor)
-            print("\nNo categories need processing yet. Sleeping for 24 hours...")
-        except psycopg2.Error as e:
-            print(f"Database error in LDA: {e}")
-            
-        for _ in range(86400):
-            if not running:
-                return
-            time.sleep(1)
+def run_lda(leader, runner, state):
+    """Refreshes topics in the LDA worker process on the elected replica, only when new articles were processed"""
+    if not leader.acquire():
+        print("LDA running on another replica")
+        return LEADER_RETRY_INTERVAL
+    run_start = datetime.now(timezone.utc)
+    try:
+        if state['since'] is not None:
+            with articles_pool().cursor() as cursor:
+                new_data = categories_with_new_data(cursor, state['since'])
+            if not new_data:
+                print("No newly processed articles since last LDA refresh")
+                return None
+            print(f"LDA refresh, new articles in {len(new_data)} categories: {new_data}")
+        runner.refresh()
+        state['since'] = run_start
+    except (psycopg2.Error, PoolTimeout) as e:
+        print(f"Database error in LDA: {e}")
+
+def build_scheduler(config):
+    """Registers the fetch, process and LDA jobs; returns the scheduler and what to close after draining"""
+    scheduler = Scheduler()
+    fetch_leader = LeaderLock(os.environ['CONN_STRING_ARTICLES'], 'fetch')
+    lda_leader = LeaderLock(os.environ['CONN_STRING_ARTICLES'], 'lda')
+    seen_urls = warm_seen_urls()
+    lda_runner = LdaRunner(os.environ['CONN_STRING_ARTICLES'])
+
+    scheduler.add('fetch', lambda: fetch_articles(config, fetch_leader, seen_urls), FETCH_INTERVAL, jitter=60)
+    # claims use FOR UPDATE SKIP LOCKED, so every replica runs this job
+    scheduler.add('process', process_articles, PROCESS_INTERVAL)
+    lda_state = {'since': None}
+    scheduler.add('lda', lambda: run_lda(lda_leader, lda_runner, lda_state), LDA_INTERVAL, jitter=300)
+    scheduler.add('cache', evict_result_cache, RESULT_CACHE_EVICT_INTERVAL, jitter=300)
+
+    listener = PendingListener(os.environ['CONN_STRING_ARTICLES'], debounce=PROCESS_DEBOUNCE)
+    listener_thread = threading.Thread(target=listen_for_articles, args=(listener, scheduler), name="listener", daemon=True)
+
+    closers = [fetch_leader.close, lda_leader.close, lda_runner.close]
+    return scheduler, listener_thread, closers
+
+def drain(scheduler, timeout):
+    """Lets in-flight chunks finish and write their results, then releases whatever this replica still holds"""
+    drain_start = time.monotonic()
+    deadline = drain_start + timeout
+    scheduler.stop()
+    while scheduler.busy() and time.monotonic() < deadline:
+        print(f"Draining {', '.join(scheduler.busy())}, {deadline - time.monotonic():.0f}s left")
+        scheduler.join(min(5, max(0, deadline - time.monotonic())))
+
+    released = 0
+    try:
+        with articles_pool().cursor() as cursor:
+            released = release_owner(cursor, OWNER_ID)
+    except (psycopg2.Error, PoolTimeout) as e:
+        print(f"Database error while releasing claims: {e}")
+    timed_out = bool(scheduler.busy())
+    print(
+        f"Drain {'timed out' if timed_out else 'complete'} after {time.monotonic() - drain_start:.1f}s, "
+        f"released {released} unfinished claims"
+    )
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Fetch, process and model articles in a loop.')
+    parser.add_argument(
+        '--connection-budget',
+        type=int,
+        default=CONNECTION_BUDGET,
+        help='Connections this replica may open on each database server, pools and leader/listener sessions included; '
+             'keep the sum over replicas under max_connections minus superuser_reserved_connections'
+    )
+    parser.add_argument(
+        '--drain-timeout',
+        type=int,
+        default=DRAIN_TIMEOUT,
+        help='Seconds to let in-flight chunks finish on shutdown before releasing their claims'
+    )
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        default=METRICS_PORT,
+        help='Port for the Prometheus /metrics endpoint on localhost; 0 disables it'
+    )
+    parser.add_argument(
+        '--failure-report',
+        action='store_true',
+        help='Print the top article failure reasons and exit'
+    )
+    return parser.parse_args()
+
+def print_failure_report():
+    """Top reasons articles are retrying or dead-lettered over the last week"""
+    with articles_pool().cursor() as cursor:
+        rows = failure_report(cursor)
+    if not rows:
+        print("No article failures recorded")
+        return
+    print(f"{'status':<12} {'articles':>8} {'attempts':>8}  reason")
+    for status, reason, count, attempts in rows:
+        print(f"{status:<12} {count:>8} {attempts:>8}  {reason}")
+
+def count_pending():
+    with articles_pool().cursor() as cursor:
+        return pending_depth(cursor)
+
+def start_metrics(port, scheduler):
+    """Serves pool, queue, claim, chunk, LLM, fetch and job metrics; returns the server, or None when disabled"""
+    if not port:
+        return None
+    watch_pools({'articles': articles_pool, 'backend': backend_pool})
+    watch_pending_depth(count_pending)
+    watch_scheduler(scheduler)
+    record_controller(CONTROLLER)
+    try:
+        return start_metrics_server(port)
+    except OSError as e:
+        print(f"Could not start metrics endpoint on port {port}: {e}")
+        return None
 
 def check_environment():
     required_vars = [
@@ -286,22 +496,31 @@ def main():
     signal.signal(signal.SIGINT, signal_handler)  
     signal.signal(signal.SIGTERM, signal_handler) 
 
+    args = parse_args()
     check_environment()
-    cleanup_stale_locks()
+    if args.failure_report:
+        print_failure_report()
+        return
+    size_pools(workers_for_budget(args.connection_budget))
+    print(f"Connection budget {args.connection_budget} per server: up to {CONTROLLER.max_workers} workers")
+    try:
+        with articles_pool().cursor() as cursor:
+            ensure_claim_schema(cursor)
+            ensure_watermark_table(cursor)
+            ensure_result_cache_table(cursor)
+    except (psycopg2.Error, PoolTimeout) as e:
+        print(f"Database error while preparing tables: {e}")
+    reclaim_expired_articles()
 
-    with open('gcam_config.json') as file:
-        data = json.load(file)
+    config = get_registry()
+    config.get()
 
     print("Starting main loop")
-    fetch_thread = threading.Thread(target=fetch_articles_loop, args=(data,), daemon=True)
-    print("Fetch thread started")
-    process_thread = threading.Thread(target=process_articles_loop, daemon=True)
-    print("Process thread started")
-    lda_thread = threading.Thread(target=run_daily_lda, daemon=True)
-
-    threads = [fetch_thread, process_thread, lda_thread]
-    for t in threads:
-        t.start()
+    scheduler, listener_thread, closers = build_scheduler(config)
+    metrics_server = start_metrics(args.metrics_port, scheduler)
+    scheduler.start()
+    listener_thread.start()
+    print("Scheduler started")
 
     try:
         while running:
@@ -311,14 +530,16 @@ def main():
         running = False  
 
     print("Shutting now")
-    cleanup_stale_locks()
-
-    #giving worker threads some time to exit
-    for _ in range(10):
-        if not any(t.is_alive() for t in threads):
-            break
-        print("Waiting for threads to exit")
-        time.sleep(1)
+    drain(scheduler, args.drain_timeout)
+    print(f"Scheduler: {scheduler.metrics()}")
+    for close in closers:
+        close()
+    if metrics_server is not None:
+        metrics_server.shutdown()
+
+    print(f"Articles pool: {articles_pool().metrics()}")
+    print(f"Backend pool: {backend_pool().metrics()}")
+    close_pools()
 
     print("Shutdown DONE")
     os._exit(0)  
@@ -0,0 +1,88 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.scheduling.adaptive_wait import AdaptiveWait
+
+
+class Feed:
+    """Scripted (arrived so far, backlog) samples on a fake clock that advances by the last interval"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.arrived = 0
+        self.backlog = 0
+
+    def clock(self):
+        return self.now
+
+    def sample(self):
+        return self.arrived, self.backlog
+
+
+def make_wait(feed, target_batch=100):
+    return AdaptiveWait(feed.sample, 30, 900, target_batch, log=lambda _: None, clock=feed.clock)
+
+
+def step(wait, feed, arrived, backlog):
+    feed.now += wait.interval
+    feed.arrived += arrived
+    feed.backlog = backlog
+    return wait.next_interval()
+
+
+def test_full_polls_shrink_to_min_wait():
+    feed = Feed()
+    wait = make_wait(feed)
+    feed.backlog = 100
+    assert wait.next_interval() == 30
+    # every poll comes back full: a steady 100 per interval must not stretch the wait
+    intervals = [step(wait, feed, 100, 100) for _ in range(10)]
+    assert intervals[-1] == 30
+
+
+def test_full_polls_after_quiet_start_shrink():
+    feed = Feed()
+    wait = make_wait(feed)
+    wait.next_interval()
+    intervals = [step(wait, feed, 100, 100) for _ in range(6)]
+    assert intervals == sorted(intervals, reverse=True)
+    assert intervals[-1] == 30
+
+
+def test_idle_stretches_to_max_wait():
+    feed = Feed()
+    wait = make_wait(feed)
+    feed.backlog = 100
+    wait.next_interval()
+    intervals = [step(wait, feed, 0, 0) for _ in range(12)]
+    assert intervals[-1] == 900
+
+
+def test_partial_polls_follow_arrival_rate():
+    feed = Feed()
+    wait = make_wait(feed)
+    wait.next_interval()
+    for _ in range(30):
+        interval = step(wait, feed, int(wait.interval * 0.5), 40)  # 0.5 articles/s
+    assert abs(interval - 200) < 5  # 100 articles at 0.5/s
+
+
+def test_failed_sample_keeps_interval():
+    feed = Feed()
+    wait = make_wait(feed)
+
+    def broken():
+        raise RuntimeError("stats unavailable")
+
+    wait.sample = broken
+    assert wait.next_interval() == 900
+
+
+def test_sleep_returns_on_shutdown():
+    feed = Feed()
+    wait = make_wait(feed)
+    event = threading.Event()
+    event.set()
+    assert wait.sleep(event) is True
@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.processing.dispatcher import CategoryDispatcher, group_by_category
+
+
+class Recorder:
+    """Worker stand-in that tracks how many chunks run at once, overall and per category"""
+
+    def __init__(self, seconds=0.02):
+        self.seconds = seconds
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+        self.started = []
+        self.done = []
+
+    def __call__(self, chunk, prompt, chunk_id):
+        with self.lock:
+            self.started.append(chunk[0][4])
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.seconds)
+        with self.lock:
+            self.running -= 1
+            self.done.append(chunk[0][4])
+
+
+def chunks(counts):
+    return {category: [[('url', 'title', 'English', 'US', category, 'CODE')]] * n for category, n in counts.items()}
+
+
+def test_freed_workers_go_to_running_categories():
+    counts = {'A': 100, **{category: 10 for category in 'BCDEFGHI'}}
+    worker = Recorder()
+    peak = CategoryDispatcher(worker, 45).run(chunks(counts), lambda category: 'prompt')
+    assert len(worker.done) == sum(counts.values())
+    assert worker.peak <= 45
+    # A starts with an equal share, then takes over the slots B..I free up
+    assert peak['A'] > 30
+
+
+def test_categories_share_workers_evenly():
+    worker = Recorder()
+    CategoryDispatcher(worker, 4).run(chunks({category: 5 for category in 'ABCDEFGHIJ'}), lambda category: 'prompt')
+    assert worker.peak <= 4
+    assert len(set(worker.started[:4])) == 4
+
+
+def test_category_limits_are_respected():
+    worker = Recorder()
+    peak = CategoryDispatcher(worker, 10, limits={'A': 2}).run(chunks({'A': 20, 'B': 3}), lambda category: 'prompt')
+    assert peak['A'] == 2
+    assert len(worker.done) == 23
+
+
+def test_queued_chunks_are_dropped_on_shutdown():
+    worker = Recorder()
+    stop = threading.Event()
+    threading.Timer(0.05, stop.set).start()
+    CategoryDispatcher(worker, 2, should_continue=lambda: not stop.is_set()).run(
+        chunks({'A': 100}), lambda category: 'prompt'
+    )
+    assert len(worker.done) < 100
+
+
+def test_group_by_category_splits_into_homogeneous_chunks():
+    articles = [(f"url-{i}", 't', 'English', 'US', 'AB'[i % 2], 'CODE') for i in range(5)]
+    grouped = group_by_category(articles, 2)
+    assert [len(chunk) for chunk in grouped['A']] == [2, 1]
+    assert [len(chunk) for chunk in grouped['B']] == [2]
@@ -0,0 +1,81 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.processing.near_duplicates import cluster_by_key
+from core.processing.titles import story_title
+
+TITLE = "Madrid bans single-use plastic bags in all city markets from next year"
+
+ENTITY_SWAPS = [
+    (TITLE, "Valencia bans single-use plastic bags in all city markets from next year"),
+    (
+        "Trump announces new tariffs on steel and aluminium imports from China",
+        "Trump announces new tariffs on steel and aluminium imports from Chile",
+    ),
+]
+
+
+def article(url, title, language='English'):
+    return (url, title, language, 'Spain', 'environment', 'CODE_1')
+
+
+def story_key(row):
+    """Stand-in for ResultCache.key: scope plus story, without the prompt hash"""
+    _, title, language, sourcecountry, category, _ = row
+    return (category, language, sourcecountry, story_title(title))
+
+
+def cluster(titles):
+    articles = [article(f"https://example.com/{i}", title) for i, title in enumerate(titles)]
+    return cluster_by_key(articles, story_key)
+
+
+@pytest.mark.parametrize('first, second', ENTITY_SWAPS)
+def test_entity_swaps_stay_separate(first, second):
+    leaders, followers = cluster([first, second])
+    assert len(leaders) == 2
+    assert followers == []
+
+
+@pytest.mark.parametrize('first, second', ENTITY_SWAPS)
+def test_entity_swaps_with_site_suffixes_stay_separate(first, second):
+    leaders, followers = cluster([f"{first} - El País", f"{second} | Las Provincias"])
+    assert len(leaders) == 2
+    assert followers == []
+
+
+def test_site_suffixes_merge():
+    leaders, followers = cluster([f"{TITLE} - El País", f"{TITLE} | Las Provincias", TITLE.upper()])
+    assert [row[1] for row in leaders] == [f"{TITLE} - El País"]
+    assert len(followers) == 2
+
+
+def test_scopes_do_not_merge():
+    first = article('https://example.com/1', TITLE)
+    second = article('https://example.com/2', TITLE, language='Spanish')
+    leaders, followers = cluster_by_key([first, second], story_key)
+    assert leaders == [first, second]
+    assert followers == []
+
+
+def test_uncacheable_articles_lead():
+    rows = [article(f"https://example.com/{i}", "Home") for i in range(3)]
+    leaders, followers = cluster_by_key(rows, lambda row: None)
+    assert leaders == rows
+    assert followers == []
+
+
+def test_story_title_drops_site_furniture():
+    assert story_title("Plastic waste | Madrid bans single-use bags - La Provincia") == 'madrid bans single use bags'
+
+
+def test_result_cache_key_ignores_site_furniture():
+    result_cache = pytest.importorskip('core.processing.result_cache')
+    cache = result_cache.ResultCache()
+    first = cache.key(article('https://example.com/1', f"{TITLE} - El País"), 'prompt')
+    assert first == cache.key(article('https://example.com/2', f"{TITLE} | Las Provincias"), 'prompt')
+    assert first != cache.key(article('https://example.com/3', ENTITY_SWAPS[0][1]), 'prompt')
+    assert cache.key(article('https://example.com/4', "Home - El País"), 'prompt') is None
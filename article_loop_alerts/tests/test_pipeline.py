@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('psycopg2')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.scheduling.pipeline import StagePipeline, StageStats
+
+
+def test_running_stage_without_polls_warns_once():
+    stats = StageStats('extract', 10)
+    stats.record("SELECT * FROM articles WHERE step = 'extract' LIMIT 10", 10)
+    silent = StageStats('translate', 10)
+    silent.record("SELECT * FROM articles WHERE step = 'translate' FETCH FIRST 10 ROWS ONLY", 10)
+    warnings = []
+    pipeline = StagePipeline([(stats, None), (silent, None)], report_interval=0, log=lambda _: None, warn=warnings.append)
+
+    class Alive:
+        def is_alive(self):
+            return True
+
+    pipeline.report(0, [Alive(), Alive()])
+    pipeline.report(0, [Alive(), Alive()])
+    assert len(warnings) == 1
+    assert warnings[0].startswith('Stage translate has recorded no polls')
@@ -0,0 +1,36 @@
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.metrics.registry import REGISTRY
+from core.metrics.loop import watch_scheduler
+from core.scheduling.scheduler import Scheduler
+
+
+def test_job_runs_are_published():
+    scheduler = Scheduler()
+    ran = threading.Event()
+
+    def job():
+        ran.set()
+        raise RuntimeError("boom")
+
+    scheduler.add('metrics_test_job', job, interval=3600)
+    watch_scheduler(scheduler)
+    scheduler.start()
+    try:
+        assert ran.wait(5)
+        deadline = time.monotonic() + 5
+        while scheduler.metrics()['metrics_test_job']['runs'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        scheduler.stop()
+        scheduler.join(5)
+
+    text = REGISTRY.render()
+    assert 'article_loop_job_seconds_count{job="metrics_test_job"} 1' in text
+    assert 'article_loop_job_failures_total{job="metrics_test_job"} 1' in text
+    assert 'article_loop_job_missed_total{job="metrics_test_job"} 0' in text
+    assert 'article_loop_job_skipped_total{job="metrics_test_job"} 0' in text